@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渐变背景基准：原 putpixel 双重循环 vs NumPy 向量化实现，并校验逐像素一致
+用法（仓库根目录）: python3 benchmarks/bench_gradients.py [--size 1080x1920]
+"""
+import os, sys, time, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image, ImageChops
+import smart_image_generator as sig
+
+def legacy_background(analysis, width, height):
+    """优化前的逐像素实现（原样保留，作为对照基准）"""
+    colors = sig.get_theme_colors(analysis)
+    img = Image.new('RGB', (width, height), colors[0])
+    if analysis["主题"] == "product_launch":
+        for y in range(height):
+            for x in range(width):
+                center_x, center_y = width//2, height//3
+                distance = ((x - center_x)**2 + (y - center_y)**2)**0.5
+                max_distance = width * 0.8
+                ratio = min(distance / max_distance, 1.0)
+                r = int(colors[0][0] * (1 - ratio) + colors[1][0] * ratio)
+                g = int(colors[0][1] * (1 - ratio) + colors[1][1] * ratio)
+                b = int(colors[0][2] * (1 - ratio) + colors[1][2] * ratio)
+                img.putpixel((x, y), (r, g, b))
+    elif analysis["主题"] == "innovation":
+        for y in range(height):
+            ratio = y / height * 0.8 + (height - y) / height * 0.2
+            for x in range(width):
+                x_ratio = x / width * 0.3
+                final_ratio = (ratio + x_ratio) / 1.3
+                r = int(colors[0][0] * (1 - final_ratio) + colors[1][0] * final_ratio)
+                g = int(colors[0][1] * (1 - final_ratio) + colors[1][1] * final_ratio)
+                b = int(colors[0][2] * (1 - final_ratio) + colors[1][2] * final_ratio)
+                img.putpixel((x, y), (r, g, b))
+    else:
+        for y in range(height):
+            ratio = y / height
+            color = tuple(int(colors[0][i] * (1 - ratio) + colors[1][i] * ratio) for i in range(3))
+            for x in range(width):
+                img.putpixel((x, y), color)
+    return img
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", default="%dx%d" % (sig.W, sig.H))
+    args = ap.parse_args()
+    w, h = map(int, args.size.lower().split("x"))
+    for theme, scheme in [("product_launch", "green"), ("innovation", "orange"), ("technology", "blue")]:
+        analysis = {"主题": theme, "颜色方案": scheme}
+        old, t_old = timed(lambda: legacy_background(analysis, w, h))
+        new, t_new = timed(lambda: sig.create_semantic_background(analysis, w, h))
+        same = ImageChops.difference(old, new).getbbox() is None
+        print("%-15s legacy=%7.3fs numpy=%7.4fs speedup=%7.1fx identical=%s" % (
+            theme, t_old, t_new, t_old / max(t_new, 1e-9), same))
+
+if __name__ == "__main__":
+    main()
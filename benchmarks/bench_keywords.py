@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词标注基准：逐组 `key in content` 扫描（旧路径，不检查单词边界）与编译后的词典匹配对比
+用法（仓库根目录）: python3 benchmarks/bench_keywords.py [--docs 5000]
+"""
+import os, sys, time, random, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keywords import LEXICON_DEFAULTS, Lexicon
+
+WORDS = ("openai releases new gpt model metadata submit anthropic claude google meta nvidia chip "
+         "tesla robot agent benchmark startup funding research safety data").split()
+ZH_WORDS = "发布 推出 机器人 芯片 算法 自动驾驶 人工智能 深度学习 数据 安全 监管 合作 投资 研发 突破 模型".split()
+FILLER = ("the a company said on monday that its new system would improve results for users "
+          "across many markets and regions according to people familiar with the plan").split()
+
+def make_corpus(n_docs, seed=42):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n_docs):
+        words = ZH_WORDS if i % 2 else WORDS
+        sep = "" if i % 2 else " "
+        docs.append(sep.join(rng.choice(words) for _ in range(rng.randint(30, 80))))
+    return docs
+
+def make_sparse_corpus(n_docs, seed=7):
+    """新闻正文式语料：大部分是普通词，只夹带少量关键词"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(FILLER) if rng.random() > 0.03 else rng.choice(WORDS)
+                     for _ in range(rng.randint(120, 200))) + " " + rng.choice(ZH_WORDS)
+            for _ in range(n_docs)]
+
+def tag_substring(text, lex=LEXICON_DEFAULTS):
+    """旧路径：每组词典各扫一遍，子串匹配"""
+    content = text.lower()
+    return {
+        "companies": [k for k in lex["companies"] if k in content],
+        "products": [k for k in lex["products"] if k in content],
+        "prompts": [k for k in lex["prompts"] if k in text],
+        "themes": [i for i, r in enumerate(lex["themes"]) if any(w in content for w in r["words"])],
+    }
+
+def bench(label, fn, docs):
+    t0, c0 = time.perf_counter(), time.process_time()
+    out = fn(docs)
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    print("%-28s wall=%7.3fs cpu=%7.3fs per_doc=%7.1fus" % (label, wall, cpu, wall * 1e6 / len(docs)))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=5000)
+    args = ap.parse_args()
+    docs = make_corpus(args.docs)
+    print("corpus: %d docs, %d chars" % (len(docs), sum(map(len, docs))))
+
+    old = bench("substring scans", lambda d: [tag_substring(t) for t in d], docs)
+    t0 = time.perf_counter()
+    lex = Lexicon(**LEXICON_DEFAULTS)
+    print("%-28s %.2fms" % ("compile", (time.perf_counter() - t0) * 1000))
+    new = bench("lexicon tag_batch", lex.tag_batch, docs)
+    diff = sum(1 for a, b in zip(old, new) if a["companies"] != b["companies"])
+    print("docs whose company tags differ (word boundaries): %d" % diff)
+
+    sparse = make_sparse_corpus(args.docs)
+    print("sparse corpus: %d docs, %d chars" % (len(sparse), sum(map(len, sparse))))
+    bench("substring scans", lambda d: [tag_substring(t) for t in d], sparse)
+    bench("lexicon tag_batch", lex.tag_batch, sparse)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线图片接口基准：旧的逐条阻塞请求（无重试）与并发客户端对比，全部打到本地桩服务
+用法（仓库根目录）: python3 benchmarks/bench_remote_images.py [--items 24 --concurrency 4]
+"""
+import os, sys, time, tempfile, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import requests
+import stub_image_server
+from image_backend import StabilityBackend, RemoteImageClient
+
+def serial(backend, jobs, timeout):
+    """原 generate_with_stability_api 的行为：逐条请求，失败即放弃"""
+    ok = 0
+    for key, prompt, path in jobs:
+        url, headers, data = backend.request(prompt)
+        try:
+            resp = requests.post(url, headers=headers, json=data, timeout=timeout)
+            if resp.status_code == 200 and backend.parse(resp):
+                ok += 1
+        except requests.RequestException:
+            pass
+    return ok
+
+def bench(label, fn):
+    t0, c0 = time.perf_counter(), time.process_time()
+    ok = fn()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    print("%-26s ok=%3d wall=%7.2fs cpu=%6.2fs" % (label, ok, wall, cpu))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=24)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--fail", type=float, default=0.15)
+    ap.add_argument("--rate-limit", type=float, default=0.1)
+    ap.add_argument("--slow", type=float, default=0.05)
+    ap.add_argument("--slow-s", type=float, default=6.0)
+    ap.add_argument("--deadline", type=float, default=4.0)
+    args = ap.parse_args()
+    server, state, url = stub_image_server.start(fail=args.fail, rate_limit=args.rate_limit,
+                                                 slow=args.slow, slow_s=args.slow_s)
+    backend = StabilityBackend(api_key="stub", url=url)
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [(i, "prompt %d" % i, os.path.join(tmp, "%d.png" % i)) for i in range(args.items)]
+        bench("serial (no retry)", lambda: serial(backend, jobs, args.slow_s + 1))
+        print("  stub:", state.counts)
+        state.counts = dict.fromkeys(state.counts, 0)
+        state.max_inflight = 0
+        client = RemoteImageClient(backend, concurrency=args.concurrency, retries=3, backoff=0.2,
+                                   timeout=args.deadline, deadline=args.deadline)
+        results = []
+        bench("async c=%d (retry+deadline)" % args.concurrency,
+              lambda: sum(r.ok for r in client.run(jobs, results.append)))
+        print("  stub:", state.counts, "max_inflight=%d" % state.max_inflight)
+        print("  failures:", sorted({r.error for r in results if not r.ok}) or "none")
+        print("  first results in completion order:", [r.key for r in results[:8]])
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
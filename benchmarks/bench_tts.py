@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+旁白合成基准（本地 TTS 桩服务）：逐段串行、并行冷启动、改动一段、全部命中缓存
+用法（仓库根目录）: python3 benchmarks/bench_tts.py [--stories 10 --latency 0.8 --workers 4]
+"""
+import os, sys, time, tempfile, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stub_tts_server
+from generate_audio import SegmentSynth, synthesize_segments
+
+def make_script(n):
+    segs = [{"id": "intro", "kind": "intro", "text": "大家好，这里是每日AI速览。"}]
+    segs += [{"id": "story-%d" % (k + 1), "kind": "story", "index": k,
+              "text": "%d）第 %d 条新闻的标题与摘要内容。" % (k + 1, k + 1) * (1 + k % 3)} for k in range(n)]
+    segs.append({"id": "outro", "kind": "outro", "text": "以上就是今天的AI要闻，我们下期见。"})
+    return {"news": "", "segments": segs}
+
+def bench(label, synth, script, out):
+    t0 = time.perf_counter()
+    timing = synthesize_segments(script, out, synth)
+    print("%-14s wall=%6.2fs segments=%d audio=%.1fs  %s" % (
+        label, time.perf_counter() - t0, len(timing), sum(t["duration"] for t in timing), synth.summary()))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stories", type=int, default=10)
+    ap.add_argument("--latency", type=float, default=0.8)
+    ap.add_argument("--fail", type=float, default=0.1)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+    server, state, url = stub_tts_server.start(latency=args.latency, fail=args.fail)
+    script = make_script(args.stories)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.mp3")
+        opts = dict(backend="http", url=url, retries=3)
+        bench("serial cold", SegmentSynth(workers=1, cache_dir=os.path.join(tmp, "c1"), **opts), script, out)
+        cache = os.path.join(tmp, "c2")
+        bench("parallel cold", SegmentSynth(workers=args.workers, cache_dir=cache, **opts), script, out)
+        script["segments"][3]["text"] += "（更新）"
+        bench("1 changed", SegmentSynth(workers=args.workers, cache_dir=cache, **opts), script, out)
+        bench("warm", SegmentSynth(workers=args.workers, cache_dir=cache, **opts), script, out)
+        print("stub:", state.counts, "max_inflight=%d" % state.max_inflight)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频合成基准：moviepy 逐帧合成路径、ffmpeg 静态幻灯片快速路径（默认 30 fps 与可选的 5 fps）
+与分段编码（冷启动 / 改动一条 / 全部复用）对比
+CPU 时间包含 ffmpeg 子进程（os.times 的 children 部分）
+用法（仓库根目录）: python3 benchmarks/bench_video.py [--slides 8 --seconds 60]
+"""
+import os, sys, time, tempfile, subprocess, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import generate_video
+
+def make_audio(path, seconds):
+    subprocess.run([generate_video.ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", "sine=frequency=440:duration=%d" % seconds, "-c:a", "libmp3lame", path], check=True)
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+def bench(label, fn, out):
+    t0, c0 = time.perf_counter(), cpu_seconds()
+    fn()
+    wall, cpu = time.perf_counter() - t0, cpu_seconds() - c0
+    print("%-12s wall=%7.2fs cpu=%7.2fs size=%6.0fKB duration=%.2fs" % (
+        label, wall, cpu, os.path.getsize(out) / 1024, generate_video.audio_duration(out)))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--slides", type=int, default=8)
+    ap.add_argument("--seconds", type=int, default=60)
+    ap.add_argument("--skip-moviepy", action="store_true")
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        audio = os.path.join(tmp, "a.mp3")
+        make_audio(audio, args.seconds)
+        slides = [("", "第 %d 条新闻标题 Benchmark headline" % k, "摘要内容 summary text " * 12)
+                  for k in range(args.slides)]
+        durations = [args.seconds / args.slides] * args.slides
+        print("%d slides, %ds audio" % (args.slides, args.seconds))
+        if not args.skip_moviepy:
+            out = os.path.join(tmp, "moviepy.mp4")
+            bench("moviepy", lambda: generate_video.render_moviepy(slides, durations, audio, out), out)
+        for fps in (30, 5):
+            out = os.path.join(tmp, "ffmpeg%d.mp4" % fps)
+            bench("ffmpeg@%d" % fps, lambda: generate_video.render_ffmpeg(slides, durations, audio, out, fps), out)
+        seg_dir = os.path.join(tmp, "segments")
+        out = os.path.join(tmp, "segments.mp4")
+        run = lambda: generate_video.render_segments(slides, durations, audio, out, seg_dir=seg_dir)
+        bench("seg cold", run, out)
+        slides[0] = (slides[0][0], slides[0][1] + "（更新）", slides[0][2])
+        bench("seg 1 chg", run, out)
+        bench("seg warm", run, out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地在线图片接口桩服务（模拟 Stability text-to-image 的请求与响应格式）
+可配置延迟、慢请求、429/503 失败率，用于离线测试并发客户端的重试、时限与吞吐
+用法（仓库根目录）: python3 benchmarks/stub_image_server.py --port 8765 --fail 0.2
+然后: STABILITY_API_KEY=stub STABILITY_API_URL=http://127.0.0.1:8765/ python3 generate_images_advanced.py
+"""
+import json, time, base64, random, argparse, threading
+from io import BytesIO
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+
+def make_png(color=(40, 90, 200), size=(64, 112)):
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+class StubState:
+    def __init__(self, latency=(0.2, 0.6), slow=0.0, slow_s=5.0, fail=0.0, rate_limit=0.0, seed=1):
+        self.latency, self.slow, self.slow_s = latency, slow, slow_s
+        self.fail, self.rate_limit = fail, rate_limit
+        self.rng = random.Random(seed)
+        self.png = make_png()
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "503": 0, "slow": 0}
+        self.inflight = self.max_inflight = 0
+
+    def draw(self):
+        with self.lock:
+            return self.rng.random(), self.rng.random(), self.rng.uniform(*self.latency)
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        st = self.state
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        r_fail, r_slow, delay = st.draw()
+        with st.lock:
+            st.counts["requests"] += 1
+            st.inflight += 1
+            st.max_inflight = max(st.max_inflight, st.inflight)
+        try:
+            if r_fail < st.rate_limit:
+                st.counts["429"] += 1
+                return self._reply(429, b'{"message": "rate limited"}', [("Retry-After", "0.2")])
+            if r_fail < st.rate_limit + st.fail:
+                time.sleep(delay / 2)
+                st.counts["503"] += 1
+                return self._reply(503, b'{"message": "unavailable"}')
+            if r_slow < st.slow:
+                st.counts["slow"] += 1
+                delay = st.slow_s
+            time.sleep(delay)
+            st.counts["ok"] += 1
+            body = json.dumps({"artifacts": [{"base64": st.png, "finishReason": "SUCCESS"}]}).encode()
+            self._reply(200, body, [("Content-Type", "application/json")])
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已因时限放弃
+        finally:
+            with st.lock:
+                st.inflight -= 1
+
+def start(port=0, **opts):
+    """后台线程启动桩服务，返回 (server, state, url)"""
+    state = StubState(**opts)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, "http://127.0.0.1:%d/" % server.server_address[1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fail", type=float, default=0.1, help="503 比例")
+    ap.add_argument("--rate-limit", type=float, default=0.1, help="429 比例")
+    ap.add_argument("--slow", type=float, default=0.05, help="慢请求比例")
+    ap.add_argument("--slow-s", type=float, default=10.0)
+    args = ap.parse_args()
+    server, state, url = start(args.port, fail=args.fail, rate_limit=args.rate_limit,
+                               slow=args.slow, slow_s=args.slow_s)
+    print("stub listening on %s" % url)
+    try:
+        while True:
+            time.sleep(5)
+            print(state.counts, "max_inflight=%d" % state.max_inflight)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
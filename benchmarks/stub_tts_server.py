@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 TTS 桩服务：POST {"text", "voice"} 返回 MP3（正弦音，时长与文本长度成正比，编码参数固定，可流复制拼接）
+可配置延迟与 503 失败率，用于离线测试 generate_audio 的缓存、并发与重试
+用法（仓库根目录）: python3 benchmarks/stub_tts_server.py --port 8767
+然后在 config.yaml 的 tts 段设置 backend: http, url: http://127.0.0.1:8767/
+"""
+import os, sys, json, time, random, argparse, threading, subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ffmpeg_utils import ffmpeg_exe
+
+CHAR_SECONDS = 0.12  # 每个字符对应的朗读时长
+
+class StubState:
+    def __init__(self, latency=0.5, fail=0.0, seed=1):
+        self.latency, self.fail = latency, fail
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "503": 0}
+        self.inflight = self.max_inflight = 0
+        self._audio = {}
+
+    def audio(self, seconds):
+        """按时长（取整到 0.1 秒）生成并缓存一段 MP3"""
+        key = round(seconds, 1)
+        with self.lock:
+            if key not in self._audio:
+                self._audio[key] = subprocess.run(
+                    [ffmpeg_exe(), "-loglevel", "error", "-f", "lavfi",
+                     "-i", "sine=frequency=300:sample_rate=24000:duration=%.1f" % key,
+                     "-ac", "1", "-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3", "-"],
+                    check=True, capture_output=True).stdout
+            return self._audio[key]
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, ctype):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        st = self.state
+        req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with st.lock:
+            st.counts["requests"] += 1
+            st.inflight += 1
+            st.max_inflight = max(st.max_inflight, st.inflight)
+            failed = st.rng.random() < st.fail
+        try:
+            time.sleep(st.latency)
+            if failed:
+                st.counts["503"] += 1
+                return self._reply(503, b'{"message": "unavailable"}', "application/json")
+            body = st.audio(max(0.5, len(req.get("text", "")) * CHAR_SECONDS))
+            st.counts["ok"] += 1
+            self._reply(200, body, "audio/mpeg")
+        finally:
+            with st.lock:
+                st.inflight -= 1
+
+def start(port=0, **opts):
+    """后台线程启动桩服务，返回 (server, state, url)"""
+    state = StubState(**opts)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, "http://127.0.0.1:%d/" % server.server_address[1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8767)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--fail", type=float, default=0.0, help="503 比例")
+    args = ap.parse_args()
+    server, state, url = start(args.port, latency=args.latency, fail=args.fail)
+    print("stub tts listening on %s" % url)
+    try:
+        while True:
+            time.sleep(5)
+            print(state.counts, "max_inflight=%d" % state.max_inflight)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨来源近重复新闻检测
+对标题与正文开头做中英混合分词（英文按单词、中文按单字），取 2-gram 片段，
+用 MinHash 估计 Jaccard 相似度，并以 LSH 分桶只比较候选对
+"""
+import re, zlib, random
+
+# 近重复检测默认值，可在 config.yaml 的 dedup 段覆盖
+DEDUP_DEFAULTS = {
+    "enabled": True,
+    "threshold": 0.5,   # 估计 Jaccard 相似度达到该值视为同一事件
+    "num_perm": 64,     # MinHash 签名长度
+    "bands": 16,        # LSH 分段数（每段 num_perm / bands 行）
+    "body_chars": 1500, # 参与比较的正文长度
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[一-鿿]")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "at", "by",
+    "is", "are", "was", "were", "be", "it", "its", "that", "this", "as", "from", "has",
+    "have", "will", "can", "new", "says", "said",
+    "的", "了", "是", "在", "和", "与", "也", "就", "都", "而", "及", "对",
+}
+MERSENNE = (1 << 61) - 1
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def shingles(text, k=2):
+    toks = tokenize(text)
+    if len(toks) < k:
+        return {zlib.crc32(" ".join(toks).encode("utf-8"))} if toks else set()
+    return {zlib.crc32(" ".join(toks[i:i+k]).encode("utf-8")) for i in range(len(toks) - k + 1)}
+
+class MinHasher:
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.perms = [(rng.randrange(1, MERSENNE), rng.randrange(0, MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, feats):
+        if not feats:
+            return []
+        return [min((a * x + b) % MERSENNE for x in feats) for a, b in self.perms]
+
+def similarity(sig1, sig2):
+    if not sig1 or len(sig1) != len(sig2):
+        return 0.0
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+class NearDupIndex:
+    """内存 LSH 索引：按加入顺序保留每个簇的第一条作为代表"""
+    def __init__(self, threshold=0.5, num_perm=64, bands=16, **_):
+        self.threshold = float(threshold)
+        self.bands = int(bands)
+        self.rows = max(1, int(num_perm) // self.bands)
+        self.buckets = {}
+        self.sigs = {}
+
+    def _band_keys(self, sig):
+        for b in range(self.bands):
+            yield b, tuple(sig[b*self.rows:(b+1)*self.rows])
+
+    def query(self, sig):
+        """返回与 sig 近重复的已有条目 key，没有则返回 None"""
+        seen = set()
+        for bk in self._band_keys(sig):
+            for key in self.buckets.get(bk, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if similarity(sig, self.sigs[key]) >= self.threshold:
+                    return key
+        return None
+
+    def add(self, key, sig):
+        self.sigs[key] = sig
+        for bk in self._band_keys(sig):
+            self.buckets.setdefault(bk, []).append(key)
+
+def story_text(title, body, body_chars=1500):
+    return title + "\n" + (body or "")[:body_chars]
+
+def collapse(entries, threshold=0.5, num_perm=64, bands=16, **_):
+    """
+    entries: [(key, signature)]，按优先顺序排列
+    返回 {被折叠的 key: 代表 key}
+    """
+    index = NearDupIndex(threshold, num_perm, bands)
+    dup_of = {}
+    for key, sig in entries:
+        if not sig:
+            continue
+        rep = index.query(sig)
+        if rep is not None:
+            dup_of[key] = rep
+        else:
+            index.add(key, sig)
+    return dup_of
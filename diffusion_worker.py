@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻本地 Stable Diffusion 生成器
+进程内只加载一次管线（默认小型蒸馏模型，仅读本地文件，可离线运行），
+按批次一次前向生成多条提示词，CPU 上设置 torch 线程数，
+先以低分辨率生成再放大到成品尺寸，结果按提示词哈希缓存
+"""
+import os, hashlib, threading
+from PIL import Image
+
+# 本地生成默认值，可在 config.yaml 的 diffusion 段覆盖
+DIFFUSION_DEFAULTS = {
+    "enabled": True,
+    "model": "nota-ai/bk-sdm-tiny",  # 模型 ID 或本地目录；需预先下载（setup_image_generation.sh）
+    "offline": True,          # 只读本地文件，不访问 Hugging Face
+    "batch_size": 4,          # 每次前向的提示词数
+    "steps": 20,
+    "guidance": 7.5,
+    "gen_size": [360, 640],   # 生成分辨率（宽, 高），8 的倍数；放大到成品尺寸
+    "threads": 0,             # torch 线程数，0 = CPU 核数
+    "cache_dir": "cache/diffusion",
+}
+
+def prompt_key(prompt, opts):
+    parts = [opts["model"], str(opts["steps"]), str(opts["guidance"]),
+             "%dx%d" % tuple(opts["gen_size"]), prompt]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class DiffusionWorker:
+    def __init__(self, size=(1080, 1920), **opts):
+        self.opts = dict(DIFFUSION_DEFAULTS, **opts)
+        self.size = tuple(size)
+        self.pipe = None
+        self.error = ""
+        self.stats = {"cache_hit": 0, "generated": 0, "batches": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.opts["cache_dir"], exist_ok=True)
+
+    def _load(self):
+        """首次使用时加载管线；失败原因记在 self.error，之后不再重试"""
+        if self.pipe is not None or self.error:
+            return self.pipe
+        if not self.opts["enabled"]:
+            self.error = "disabled"
+            return None
+        try:
+            if self.opts["offline"]:
+                os.environ.setdefault("HF_HUB_OFFLINE", "1")
+            import torch
+            from diffusers import StableDiffusionPipeline
+        except ImportError:
+            self.error = "未安装diffusers库"
+            return None
+        try:
+            cuda = torch.cuda.is_available()
+            if not cuda:
+                threads = int(self.opts["threads"]) or os.cpu_count() or 1
+                torch.set_num_threads(threads)
+            pipe = StableDiffusionPipeline.from_pretrained(
+                self.opts["model"],
+                torch_dtype=torch.float16 if cuda else torch.float32,
+                local_files_only=bool(self.opts["offline"]),
+                safety_checker=None,
+            )
+            pipe = pipe.to("cuda" if cuda else "cpu")
+            pipe.set_progress_bar_config(disable=True)
+            self.pipe = pipe
+        except Exception as e:
+            self.error = "%s: %s" % (type(e).__name__, e)
+        return self.pipe
+
+    def available(self):
+        with self._lock:
+            return self._load() is not None
+
+    def _cache_path(self, key):
+        return os.path.join(self.opts["cache_dir"], key[:2], key + ".png")
+
+    def _generate(self, prompts, keys):
+        import torch
+        w, h = self.opts["gen_size"]
+        # 每条提示词固定种子：同一提示词的结果可复现，与批次组成无关
+        gens = [torch.Generator("cpu").manual_seed(int(k[:8], 16)) for k in keys]
+        images = self.pipe(
+            list(prompts),
+            width=int(w),
+            height=int(h),
+            num_inference_steps=int(self.opts["steps"]),
+            guidance_scale=float(self.opts["guidance"]),
+            generator=gens,
+        ).images
+        self.stats["batches"] += 1
+        self.stats["generated"] += len(images)
+        return images
+
+    def generate(self, prompts):
+        """返回与 prompts 对应的低分辨率图片列表；未能生成的位置为 None"""
+        keys = [prompt_key(p, self.opts) for p in prompts]
+        results = [None] * len(prompts)
+        todo = {}
+        for i, key in enumerate(keys):
+            path = self._cache_path(key)
+            if os.path.exists(path):
+                try:
+                    results[i] = Image.open(path).convert("RGB")
+                    self.stats["cache_hit"] += 1
+                    continue
+                except OSError:
+                    pass
+            todo.setdefault(key, []).append(i)  # 同一批内重复的提示词只生成一次
+        if not todo:
+            return results
+        with self._lock:
+            if self._load() is None:
+                return results
+            pending = list(todo.items())
+            bs = max(1, int(self.opts["batch_size"]))
+            for start in range(0, len(pending), bs):
+                chunk = pending[start:start + bs]
+                try:
+                    images = self._generate([prompts[idx[0]] for _, idx in chunk], [k for k, _ in chunk])
+                except Exception as e:
+                    print(f"  ❌ 本地Diffusion错误: {e}")
+                    continue
+                for (key, idx), img in zip(chunk, images):
+                    path = self._cache_path(key)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    img.save(path)
+                    for i in idx:
+                        results[i] = img
+        return results
+
+    def render(self, jobs):
+        """jobs: [(提示词, 输出路径)]，放大到成品尺寸后保存；返回每项是否成功"""
+        images = self.generate([p for p, _ in jobs])
+        ok = []
+        for (_, output_path), img in zip(jobs, images):
+            if img is None:
+                ok.append(False)
+                continue
+            if img.size != self.size:
+                img = img.resize(self.size, Image.LANCZOS)
+            img.save(output_path, quality=95)
+            ok.append(True)
+        return ok
+
+    def summary(self):
+        s = self.stats
+        return "cache_hit=%d generated=%d batches=%d" % (s["cache_hit"], s["generated"], s["batches"])
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_worker(size=(1080, 1920), config_path="config.yaml"):
+    """进程内单例：首次调用时读取 config.yaml 的 diffusion 段"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            opts = {}
+            try:
+                import yaml
+                with open(config_path, "r", encoding="utf-8") as f:
+                    opts = (yaml.safe_load(f) or {}).get("diffusion") or {}
+            except Exception:
+                pass
+            _worker = DiffusionWorker(size, **opts)
+        return _worker
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取耗时与结果统计
+记录每个 HTTP 请求（耗时、字节数、状态码、重试次数、异常类型）与每个阶段
+（feed / article_download / parse / summarize / image）的耗时，
+运行结束后在新闻 JSON 旁写出 <date>.metrics.json，并打印汇总表
+"""
+import json, time, threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+PHASES = ["feed", "article_download", "parse", "summarize", "image"]
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def _agg(records):
+    durs = [r["duration"] for r in records]
+    return {
+        "count": len(records),
+        "errors": sum(1 for r in records if r.get("error")),
+        "bytes": sum(r.get("bytes", 0) for r in records),
+        "retries": sum(r.get("retries", 0) for r in records),
+        "total_s": round(sum(durs), 3),
+        "p50_s": round(_pct(durs, 0.5), 3),
+        "p95_s": round(_pct(durs, 0.95), 3),
+        "max_s": round(max(durs), 3) if durs else 0.0,
+    }
+
+class FetchMetrics:
+    def __init__(self):
+        self.requests = []
+        self.phases = []
+        self.items = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def reset(self):
+        self.__init__()
+
+    # 当前线程正在处理的来源，用于把 HTTP 请求归属到来源
+    def set_source(self, name):
+        self._local.source = name
+
+    def current_source(self):
+        return getattr(self._local, "source", "")
+
+    def record_request(self, url, duration, status=0, nbytes=0, retries=0, error=""):
+        rec = {
+            "source": self.current_source(),
+            "host": urlparse(url).netloc.lower(),
+            "url": url,
+            "duration": round(duration, 4),
+            "status": status,
+            "bytes": nbytes,
+            "retries": retries,
+            "error": error,
+        }
+        with self._lock:
+            self.requests.append(rec)
+
+    @contextmanager
+    def phase(self, name, url=""):
+        """阶段计时；调用方可在返回的字典里补充 bytes / error / cache 等字段"""
+        rec = {"phase": name, "source": self.current_source(), "url": url, "error": ""}
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        except Exception as e:
+            rec["error"] = type(e).__name__
+            raise
+        finally:
+            rec["duration"] = round(time.perf_counter() - t0, 4)
+            with self._lock:
+                self.phases.append(rec)
+
+    def record_phase(self, name, duration, source="", url=""):
+        """补记一条已知耗时的阶段（如批量处理后按篇拆分的耗时）"""
+        rec = {"phase": name, "source": source, "url": url, "error": "", "duration": round(duration, 4)}
+        with self._lock:
+            self.phases.append(rec)
+
+    def count_item(self, source):
+        with self._lock:
+            self.items[source] = self.items.get(source, 0) + 1
+
+    def report(self):
+        with self._lock:
+            reqs, phases = list(self.requests), list(self.phases)
+        sources = sorted({r["source"] for r in reqs + phases if r["source"]})
+        hosts = sorted({r["host"] for r in reqs})
+        return {
+            "started": self.started,
+            "wall_s": round(time.time() - self.started, 3),
+            "sources": {s: {
+                "items": self.items.get(s, 0),
+                "requests": _agg([r for r in reqs if r["source"] == s]),
+                "phases": {p: _agg([r for r in phases if r["source"] == s and r["phase"] == p]) for p in PHASES},
+            } for s in sources},
+            "hosts": {h: _agg([r for r in reqs if r["host"] == h]) for h in hosts},
+            "phases": {p: _agg([r for r in phases if r["phase"] == p]) for p in PHASES},
+            "requests": reqs,
+            "phase_records": phases,
+        }
+
+    def write(self, path):
+        rep = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=2)
+        return rep
+
+    def table(self, rep=None):
+        rep = rep or self.report()
+        lines = ["%-22s %5s %5s %5s %9s %8s %8s" % ("source", "items", "reqs", "errs", "KB", "total_s", "p95_s")]
+        for s, r in rep["sources"].items():
+            q = r["requests"]
+            lines.append("%-22s %5d %5d %5d %9.1f %8.2f %8.2f" % (
+                s[:22], r["items"], q["count"], q["errors"], q["bytes"] / 1024, q["total_s"], q["p95_s"]))
+        lines.append("%-22s %5s %5s %5s %9s %8s %8s" % ("phase", "", "n", "errs", "", "total_s", "p95_s"))
+        for p, a in rep["phases"].items():
+            lines.append("%-22s %5s %5d %5d %9s %8.2f %8.2f" % (p, "", a["count"], a["errors"], "", a["total_s"], a["p95_s"]))
+        lines.append("wall %.2fs" % rep["wall_s"])
+        return "\n".join(lines)
+
+METRICS = FetchMetrics()
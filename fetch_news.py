@@ -1,15 +1,72 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, re, json, time, hashlib, random, datetime
-from urllib.parse import urljoin
-import requests, feedparser
-from bs4 import BeautifulSoup
+import os, re, json, time, hashlib, random, datetime, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
+import feedparser
+from bs4 import BeautifulSoup, UnicodeDammit
+import lxml.html
 from newspaper import Article
 from dateutil.tz import tzlocal
 from pathlib import Path
+from PIL import Image
 import yaml
+import http_client
+import seen_index
+import dedup
+import summarizer
+import news_io
+from fetch_metrics import METRICS
 
-HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"}
+# 抓取并发默认值，可在 config.yaml 的 fetch 段覆盖
+FETCH_DEFAULTS = {
+    "workers": 8,             # 全局并发上限（1 = 串行）
+    "per_host": 2,            # 同一域名同时进行的请求数
+    "host_delay": [0.5, 1.2], # 同一域名相邻两次请求的间隔（秒，随机区间）
+    "image_max_mb": 8,        # 单张配图的下载上限
+}
+
+SLIDE_W = 1080                # 与 generate_video.W 一致
+SCALED_SUFFIX = ".w1080.jpg"  # 预缩放配图的文件名后缀，generate_video.make_slide 优先读取
+
+# 按文件头识别图片类型，不信任 Content-Type
+IMAGE_MAGIC = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+class HostLimiter:
+    """按域名限流：每个 host 限制并发数，并保证相邻请求之间的最小间隔"""
+    def __init__(self, per_host=2, delay=(0.5, 1.2)):
+        self.per_host = max(1, int(per_host))
+        self.delay = tuple(delay) if isinstance(delay, (list, tuple)) else (float(delay), float(delay))
+        self._lock = threading.Lock()
+        self._sems = {}
+        self._next_at = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_at.get(host, 0.0))
+                self._next_at[host] = start + random.uniform(*self.delay)
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+LIMITER = HostLimiter(FETCH_DEFAULTS["per_host"], FETCH_DEFAULTS["host_delay"])
+INDEX = None  # seen_index.SeenIndex，由 main() 打开
+IMAGE_MAX_BYTES = FETCH_DEFAULTS["image_max_mb"] * 1024 * 1024
+SIGNER = None  # dedup.MinHasher，近重复检测关闭时为 None
+DEDUP_OPTS = dict(dedup.DEDUP_DEFAULTS)
 
 def md5(s: str) -> str:
     import hashlib
@@ -24,71 +81,159 @@ def ensure_dirs():
     for d in ["output/news", "assets/images"]:
         Path(d).mkdir(parents=True, exist_ok=True)
 
-def download_image(url, out_dir="assets/images"):
-    try:
-        resp = requests.get(url, headers=HEADERS, timeout=12)
-        resp.raise_for_status()
-        ext = ".jpg"
-        ct = resp.headers.get("Content-Type", "")
-        if "png" in ct: ext = ".png"
-        name = md5(url) + ext
-        path = os.path.join(out_dir, name)
-        with open(path, "wb") as f:
-            f.write(resp.content)
-        return path
-    except Exception:
-        return ""
+def sniff_image_ext(head):
+    for magic, ext in IMAGE_MAGIC:
+        if head.startswith(magic):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return ""
+
+def write_scaled_variant(path):
+    # 预先生成 1080 宽的 JPEG，视频阶段无需再解码、缩放原图
+    out = os.path.splitext(path)[0] + SCALED_SUFFIX
+    if os.path.exists(out):
+        return out
+    with Image.open(path) as im:
+        im.draft("RGB", (SLIDE_W, SLIDE_W * 4))  # JPEG 可直接按比例降采样解码
+        im = im.convert("RGB")
+        im = im.resize((SLIDE_W, max(1, round(im.height * SLIDE_W / im.width))), Image.LANCZOS)
+        tmp = out + ".%d.tmp" % threading.get_ident()
+        try:
+            im.save(tmp, "JPEG", quality=92)
+            os.replace(tmp, out)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return out
+
+def download_image(url, out_dir="assets/images", max_bytes=None):
+    # 流式下载并限制大小；按内容哈希命名，不同 CDN 地址的同一张图只存一份
+    max_bytes = max_bytes or IMAGE_MAX_BYTES
+    tmp = os.path.join(out_dir, ".dl-%s-%d.tmp" % (md5(url), threading.get_ident()))
+    with METRICS.phase("image", url) as m:
+        try:
+            with http_client.get(url, stream=True) as resp:
+                resp.raise_for_status()
+                if int(resp.headers.get("Content-Length") or 0) > max_bytes:
+                    m["error"] = "TooLarge"
+                    return ""
+                h = hashlib.sha256()
+                size, head = 0, b""
+                with open(tmp, "wb") as f:
+                    for chunk in resp.iter_content(64 * 1024):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            m["error"] = "TooLarge"
+                            return ""
+                        if len(head) < 16:
+                            head += chunk[:16]
+                        h.update(chunk)
+                        f.write(chunk)
+            m["bytes"] = size
+            ext = sniff_image_ext(head)
+            if not ext:
+                m["error"] = "NotImage"
+                return ""
+            path = os.path.join(out_dir, h.hexdigest()[:32] + ext)
+            if os.path.exists(path):
+                os.remove(tmp)
+            else:
+                os.replace(tmp, path)
+            try:
+                write_scaled_variant(path)
+            except Exception as e:
+                # 原图已保存，预缩放失败时视频阶段退回读取原图
+                m["variant_error"] = type(e).__name__
+                print("[WARN] 配图预缩放失败 %s: %s" % (path, e))
+            return path
+        except Exception as e:
+            m["error"] = type(e).__name__
+            return ""
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+def select_one(doc, selector):
+    found = doc.cssselect(selector)
+    return found[0] if found else None
 
-def extract_first_image(soup, base_url):
-    og = soup.find("meta", property="og:image")
-    if og and og.get("content"):
-        return urljoin(base_url, og["content"])
-    img = soup.select_one("article img, .post-content img, .entry-content img, .content img, img")
-    if img and img.get("src"):
-        return urljoin(base_url, img["src"])
+def node_text(el, sep=""):
+    # 与 BeautifulSoup 的 get_text(separator=sep, strip=True) 一致：不含 script/style/template 内容与注释
+    texts = el.xpath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+    return sep.join(t.strip() for t in texts if t.strip())
+
+def extract_first_image(doc, base_url):
+    og = doc.xpath('//meta[@property="og:image"]/@content')
+    if og and og[0].strip():
+        return urljoin(base_url, og[0].strip())
+    img = select_one(doc, "article img, .post-content img, .entry-content img, .content img, img")
+    if img is not None and img.get("src"):
+        return urljoin(base_url, img.get("src"))
     return ""
 
 def parse_article(url, selectors=None):
+    # 每篇文章只下载一次：同一份 HTML 交给 newspaper 解析，
+    # 并且只构建一棵 lxml 解析树（newspaper 保留的未清理副本 art.clean_doc），供 og:image 兜底与选择器兜底共用。
+    # fetch_images=False 使 newspaper 不再为挑选配图额外下载页面内的图片
+    with METRICS.phase("article_download", url) as m:
+        try:
+            html = http_client.get_html(url)
+            m["bytes"] = len(html)
+        except Exception as e:
+            m["error"] = type(e).__name__
+            return "", "", ""
+    with METRICS.phase("parse", url) as m:
+        return parse_html(url, html, selectors, m)
+
+def parse_html(url, html, selectors, m):
+    # newspaper 解析时保留的原始树 art.clean_doc 直接用于 og:image 与选择器兜底
+    # （art.doc 已被 DocumentCleaner 改写：去掉了 class、部分节点与正文图片）；
+    # 只有 newspaper 未能建树时才自行解析一次。
+    # 未声明 charset 的页面以 bytes 传入，与 newspaper 自行下载时相同，按 <meta charset> / 内容识别编码
+    if isinstance(html, bytes):
+        html = UnicodeDammit(html, is_html=True).unicode_markup or ""
+    art = None
     try:
-        art = Article(url)
-        art.download()
+        art = Article(url, fetch_images=False)
+        art.download(input_html=html)
         art.parse()
         text = art.text.strip()
         title = art.title.strip() if art.title else ""
         top_img = art.top_image or ""
         if not top_img:
-            html = requests.get(url, headers=HEADERS, timeout=12).text
-            soup = BeautifulSoup(html, "lxml")
-            top_img = extract_first_image(soup, url)
+            top_img = extract_first_image(art.clean_doc, url)
         return title, text, top_img
-    except Exception:
-        pass
+    except Exception as e:
+        m["newspaper_error"] = type(e).__name__
     try:
-        html = requests.get(url, headers=HEADERS, timeout=12).text
-        soup = BeautifulSoup(html, "lxml")
+        doc = getattr(art, "clean_doc", None)
+        if doc is None:
+            doc = lxml.html.fromstring(html)
         title = ""
         body = ""
         img = ""
         if selectors:
             if "title" in selectors:
-                el = soup.select_one(selectors["title"])
-                if el: title = el.get_text(strip=True)
+                el = select_one(doc, selectors["title"])
+                if el is not None: title = node_text(el)
             if "body" in selectors:
-                el = soup.select_one(selectors["body"])
-                if el: body = el.get_text(separator="\n", strip=True)
+                el = select_one(doc, selectors["body"])
+                if el is not None: body = node_text(el, "\n")
             if "image" in selectors:
-                el = soup.select_one(selectors["image"])
-                if el and el.get("src"): img = urljoin(url, el.get("src"))
+                el = select_one(doc, selectors["image"])
+                if el is not None and el.get("src"): img = urljoin(url, el.get("src"))
         if not img:
-            img = extract_first_image(soup, url)
+            img = extract_first_image(doc, url)
         return title, body, img
-    except Exception:
+    except Exception as e:
+        m["error"] = type(e).__name__
         return "", "", ""
 
 def pick_links_by_selectors(list_url, selectors, limit):
     links = []
     try:
-        html = requests.get(list_url, headers=HEADERS, timeout=12).text
+        html = http_client.cached_get_text(list_url)
         soup = BeautifulSoup(html, "lxml")
         for a in soup.select(selectors["article_link"])[:limit*4]:
             href = a.get("href")
@@ -102,69 +247,252 @@ def pick_links_by_selectors(list_url, selectors, limit):
             uniq.append(u); seen.add(u)
     return uniq[:limit]
 
-def summarize_zh(text, max_sent=3):
+def summarize_zh(text, max_sent=None):
+    # max_sent 为空时取 config.yaml 的 summary.max_sent，批量与逐条输出两种模式保持一致
+    return summarizer.get_summarizer().summarize(text, max_sent)
+
+def collect_links(src):
+    METRICS.set_source(src.get("name"))
+    with METRICS.phase("feed", src.get("rss") or src.get("url") or "") as m:
+        links = _collect_links(src, m)
+        m["links"] = len(links)
+        return links
+
+def _collect_links(src, m):
+    rss = src.get("rss", "").strip()
+    url = src.get("url", "").strip()
+    limit = int(src.get("articles_per_day", 2))
+    selectors = src.get("selectors", {}) or {}
+
+    links = []
+    if rss:
+        try:
+            with LIMITER.slot(rss):
+                feed = feedparser.parse(http_client.cached_get(rss))
+            for e in feed.entries[:limit*2]:
+                link = e.get("link")
+                if link: links.append(link)
+        except Exception as e:
+            m["error"] = type(e).__name__
+    elif url and selectors:
+        with LIMITER.slot(url):
+            links = pick_links_by_selectors(url, selectors, limit)
+
+    uniq, seen = [], set()
+    for u in links:
+        if u not in seen:
+            uniq.append(u); seen.add(u)
+    return uniq[:limit]
+
+def fetch_image(img):
+    if not img:
+        return ""
+    with LIMITER.slot(img):
+        return download_image(img)
+
+def from_index(name, link, rec):
+    # 已处理过的文章：复用标题、摘要与配图，配图文件丢失时只重新下载图片
+    img_path = rec["image_path"]
+    if not (img_path and os.path.exists(img_path)):
+        img_path = fetch_image(rec["image_url"])
+    return {
+        "source": name,
+        "url": link,
+        "title": rec["title"],
+        "summary": rec["summary"],
+        "image_path": img_path,
+    }
+
+def parse_item(name, link, selectors):
+    # 阶段一：查索引，未命中则下载解析并计算近重复签名
+    METRICS.set_source(name)
+    if INDEX is not None:
+        rec = INDEX.lookup(link)
+        if rec:
+            return {"source": name, "url": link, "rec": rec,
+                    "sig": seen_index.parse_signature(rec["signature"])}
+    with LIMITER.slot(link):
+        title, body, img = parse_article(link, selectors)
+    if not (title and body):
+        return None
+    chash = seen_index.content_hash(title, body)
+    sig = []
+    if SIGNER is not None:
+        sig = SIGNER.signature(dedup.shingles(dedup.story_text(title, body, DEDUP_OPTS["body_chars"])))
+    return {
+        "source": name, "url": link, "title": title, "body": body, "img": img,
+        "chash": chash, "sig": sig,
+        "rec": INDEX.lookup_hash(chash) if INDEX is not None else None,
+    }
+
+def finish_item(raw):
+    # 阶段二：摘要与配图；索引命中时直接复用
+    name, link, rec = raw["source"], raw["url"], raw["rec"]
+    METRICS.set_source(name)
+    METRICS.count_item(name)
+    if rec:
+        item = from_index(name, link, rec)
+        if INDEX is not None and "chash" in raw:
+            INDEX.store(link, raw["chash"], item["title"], item["summary"],
+                        rec["image_url"], item["image_path"], raw["sig"])
+        return item
+    brief = raw.get("summary")
+    if not brief:
+        with METRICS.phase("summarize", link):
+            brief = summarize_zh(raw["body"])
+    img_path = fetch_image(raw["img"])
+    if INDEX is not None:
+        INDEX.store(link, raw["chash"], raw["title"], brief, raw["img"], img_path, raw["sig"])
+    return {
+        "source": name,
+        "url": link,
+        "title": raw["title"],
+        "summary": brief,
+        "image_path": img_path,
+    }
+
+def drop_near_duplicates(raws):
+    # 同一事件常被多家媒体同日报道：每个近重复簇只保留最靠前的一条
+    dup_of = dedup.collapse([(i, r["sig"]) for i, r in enumerate(raws)], **DEDUP_OPTS)
+    for i, rep in sorted(dup_of.items()):
+        print("[Dedup] %s (%s) ≈ %s (%s)" % (raws[i]["url"], raws[i]["source"], raws[rep]["url"], raws[rep]["source"]))
+    return [r for i, r in enumerate(raws) if i not in dup_of]
+
+def run_batch(pool, sources):
+    # 各源的链接列表并行获取；文章按 (源顺序, 链接顺序) 提交，结果按提交顺序收集，
+    # 因此输出顺序与串行抓取一致。解析完成后先做近重复折叠，再统一摘要、下载配图
+    link_futs = [pool.submit(collect_links, src) for src in sources]
+    parse_futs = []
+    for src, fut in zip(sources, link_futs):
+        selectors = src.get("selectors", {}) or {}
+        for link in fut.result():
+            parse_futs.append(pool.submit(parse_item, src.get("name"), link, selectors))
+    raws = [r for r in (f.result() for f in parse_futs) if r]
+    if SIGNER is not None:
+        raws = drop_near_duplicates(raws)
+    # 摘要在主线程一次批量完成（多篇文章叠成一个张量计算）；
+    # 批量耗时按正文长度拆分到各篇，归属到各自来源
+    todo = [r for r in raws if not r["rec"]]
+    if todo:
+        t0 = time.perf_counter()
+        summaries = summarizer.get_summarizer().summarize_batch([r["body"] for r in todo])
+        elapsed = time.perf_counter() - t0
+        total_len = sum(len(r["body"]) for r in todo) or 1
+        for r, summary in zip(todo, summaries):
+            r["summary"] = summary
+            METRICS.record_phase("summarize", elapsed * len(r["body"]) / total_len, r["source"], r["url"])
+    return list(pool.map(finish_item, raws))
+
+def run_streaming(pool, sources, writer):
+    # 逐条输出：按 (源顺序, 链接顺序) 检查解析结果并做近重复折叠，
+    # 完成摘要与配图的条目按顺序立即追加写出；整个来源写完后记录检查点
+    todo = [src for src in sources if src.get("name") not in writer.done_sources]
+    near = dedup.NearDupIndex(**DEDUP_OPTS) if SIGNER is not None else None
+    if near is not None and INDEX is not None:
+        for it in writer.items:  # 续跑：用已写出条目的签名预热（只读，不计入索引命中）
+            rec = INDEX.peek(it["url"])
+            sig = seen_index.parse_signature(rec["signature"]) if rec else []
+            if sig:
+                near.add(it["url"], sig)
+
+    link_futs = [pool.submit(collect_links, src) for src in todo]
+    plan = []
+    for src, fut in zip(todo, link_futs):
+        name, selectors = src.get("name"), src.get("selectors", {}) or {}
+        links = [u for u in fut.result() if u not in writer.done_urls]
+        plan.append((name, [(u, pool.submit(parse_item, name, u, selectors)) for u in links]))
+
+    queue = deque()  # (kind, future, url 或来源名)
+
+    def flush(block):
+        while queue and (block or queue[0][1] is None or queue[0][1].done()):
+            kind, fut, key = queue.popleft()
+            if kind == "item":
+                writer.write(fut.result())
+            elif kind == "skip":
+                writer.mark_url(key)
+            else:
+                writer.mark_source(key)
+
     try:
-        from snownlp import SnowNLP
-        s = SnowNLP(text)
-        sents = s.summary(max_sent)
-        if isinstance(sents, list):
-            return "；".join(sents)
-        return sents
-    except Exception:
-        paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
-        core = " ".join(paragraphs)[:600]
-        return core
+        for name, entries in plan:
+            for link, fut in entries:
+                raw = fut.result()
+                if raw and near is not None and raw["sig"]:
+                    rep = near.query(raw["sig"])
+                    if rep is not None:
+                        print("[Dedup] %s (%s) ≈ %s" % (link, name, rep))
+                        raw = None
+                    else:
+                        near.add(link, raw["sig"])
+                if raw:
+                    queue.append(("item", pool.submit(finish_item, raw), link))
+                else:
+                    queue.append(("skip", None, link))
+                flush(False)
+            queue.append(("source", None, name))
+            flush(False)
+    except BaseException:
+        # 中途出错时也把已提交的条目写出，便于续跑；写出再出错时只提示，保留原始异常
+        try:
+            flush(True)
+        except Exception as e:
+            print("[WARN] 写出已完成条目失败: %s: %s" % (type(e).__name__, e))
+        raise
+    flush(True)
+    return writer.items
 
 def main():
+    global LIMITER, INDEX, IMAGE_MAX_BYTES, SIGNER, DEDUP_OPTS
     ensure_dirs()
+    METRICS.reset()
     with open("config.yaml", "r", encoding="utf-8") as f:
         cfg = yaml.safe_load(f)
 
-    items = []
-    for src in cfg.get("sources", []):
-        name = src.get("name")
-        rss = src.get("rss", "").strip()
-        url = src.get("url", "").strip()
-        limit = int(src.get("articles_per_day", 2))
-        selectors = src.get("selectors", {}) or {}
-
-        links = []
-        if rss:
-            try:
-                feed = feedparser.parse(rss)
-                for e in feed.entries[:limit*2]:
-                    link = e.get("link")
-                    if link: links.append(link)
-            except Exception:
-                pass
-        elif url and selectors:
-            links = pick_links_by_selectors(url, selectors, limit)
-
-        uniq, seen = [], set()
-        for u in links:
-            if u not in seen:
-                uniq.append(u); seen.add(u)
-
-        for link in uniq[:limit]:
-            title, body, img = parse_article(link, selectors)
-            if not (title and body):
-                continue
-            brief = summarize_zh(body, 3)
-            img_path = download_image(img) if img else ""
-            items.append({
-                "source": name,
-                "url": link,
-                "title": title,
-                "summary": brief,
-                "image_path": img_path,
-            })
-            time.sleep(random.uniform(0.5, 1.2))
+    http_client.configure(cfg)
+    opts = dict(FETCH_DEFAULTS, **(cfg.get("fetch") or {}))
+    LIMITER = HostLimiter(opts["per_host"], opts["host_delay"])
+    workers = max(1, int(opts["workers"]))
+    IMAGE_MAX_BYTES = int(float(opts["image_max_mb"]) * 1024 * 1024)
+    INDEX = seen_index.open_index(cfg)
+    INDEX.prune()
+    DEDUP_OPTS = dict(dedup.DEDUP_DEFAULTS, **(cfg.get("dedup") or {}))
+    SIGNER = dedup.MinHasher(int(DEDUP_OPTS["num_perm"])) if DEDUP_OPTS["enabled"] else None
+    summarizer.get_summarizer(cfg)
+    sources = cfg.get("sources", [])
+    fmt = (cfg.get("output") or {}).get("format", "json")
 
     today = get_today_str()
-    out = f"output/news/{today}.json"
-    with open(out, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    if fmt == "jsonl":
+        # 逐条追加；同一天重跑时从检查点继续，已完成的来源与链接不再处理
+        out = f"output/news/{today}.jsonl"
+        writer = news_io.JsonlWriter(out)
+        if writer.items or writer.done_sources:
+            print("[Resume] %d items, %d sources done -> %s" % (len(writer.items), len(writer.done_sources), out))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                items = run_streaming(pool, sources, writer)
+        except BaseException:
+            try:
+                writer.close()
+            except Exception as e:
+                print("[WARN] 保存检查点失败: %s: %s" % (type(e).__name__, e))
+            raise
+        writer.close()
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            items = run_batch(pool, sources)
+        out = f"output/news/{today}.json"
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
     print(f"[OK] Saved %d items -> %s" % (len(items), out))
+    metrics_out = f"output/news/{today}.metrics.json"
+    rep = METRICS.write(metrics_out)
+    print(METRICS.table(rep))
+    print("[Metrics] -> %s" % metrics_out)
+    print("[HTTP cache] %s" % http_client.get_cache().summary())
+    print("[Seen index] %s" % INDEX.summary())
+    INDEX.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ffmpeg 辅助函数：定位可执行文件、读取媒体时长、流复制拼接
+音频与视频脚本共用，不依赖 moviepy
+"""
+import os, re, shutil, tempfile, subprocess
+
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def ffmpeg_exe():
+    """系统 ffmpeg 优先，其次 moviepy 依赖的 imageio-ffmpeg 自带版本"""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return ""
+
+def media_duration(path):
+    """容器头部记录的时长（秒）；与 concat demuxer 拼接时采用的偏移一致"""
+    proc = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path], capture_output=True, text=True)
+    m = DURATION_RE.search(proc.stderr)
+    if not m:
+        raise ValueError("no duration: %s" % path)
+    h, mi, sec = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(sec)
+
+def concat_copy(paths, out):
+    """concat demuxer 流复制拼接同一编码参数的片段，不重新编码"""
+    with tempfile.TemporaryDirectory(prefix="concat-") as tmp:
+        listing = os.path.join(tmp, "list.ffconcat")
+        with open(listing, "w", encoding="utf-8") as f:
+            f.write("ffconcat version 1.0\n" + "".join("file '%s'\n" % os.path.abspath(p) for p in paths))
+        subprocess.run([ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", listing, "-c", "copy", out], check=True)
+    return out
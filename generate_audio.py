@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, glob, datetime
-from gtts import gTTS
+import os, json, glob, time, hashlib, datetime, threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
 from dateutil.tz import tzlocal
+from ffmpeg_utils import media_duration, concat_copy
+
+# 语音合成默认值，可在 config.yaml 的 tts 段覆盖
+TTS_DEFAULTS = {
+    "backend": "gtts",        # gtts | http（POST {"text", "voice"}，返回 MP3；可指向本地桩服务）
+    "voice": "zh-CN",
+    "url": "",                # http 后端地址
+    "workers": 4,             # 同时合成的段数
+    "retries": 2,             # 单段失败重试次数
+    "cache_dir": "cache/tts", # 按 (文本, 音色, 后端) 哈希缓存的片段
+    "keep_days": 30,          # 超过该天数未被使用的缓存片段会被清理
+}
 
 def latest(path):
     files = sorted(glob.glob(path), reverse=True)
@@ -13,17 +26,127 @@ def get_today_str():
     now = datetime.datetime.now(tz)
     return now.astimezone().strftime("%Y-%m-%d")
 
+def load_tts_options():
+    opts = dict(TTS_DEFAULTS)
+    try:
+        import yaml
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            opts.update((yaml.safe_load(f) or {}).get("tts") or {})
+    except Exception:
+        pass
+    return opts
+
+class SegmentSynth:
+    """逐段合成：结果按 (后端, 音色, 文本) 哈希缓存在磁盘，未命中的段并行合成"""
+    def __init__(self, backend="gtts", voice="zh-CN", url="", workers=4, retries=2,
+                 cache_dir="cache/tts", keep_days=30):
+        self.backend, self.voice, self.url = backend, voice, url
+        self.workers, self.retries = max(1, int(workers)), int(retries)
+        self.cache_dir, self.keep_days = cache_dir, float(keep_days)
+        self.stats = {"cache_hit": 0, "synthesized": 0, "retries": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def cache_path(self, text):
+        key = hashlib.sha256("\x1f".join([self.backend, self.voice, text]).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".mp3")
+
+    def _synthesize(self, text, out):
+        if self.backend == "http":
+            resp = requests.post(self.url, json={"text": text, "voice": self.voice}, timeout=60)
+            resp.raise_for_status()
+            with open(out, "wb") as f:
+                f.write(resp.content)
+        else:
+            from gtts import gTTS
+            gTTS(text=text, lang=self.voice).save(out)
+
+    def clip(self, text):
+        """返回该段文本的 MP3 路径；缓存未命中时合成（失败按重试次数退避重试）"""
+        path = self.cache_path(text)
+        if os.path.exists(path):
+            os.utime(path)
+            self._count("cache_hit")
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        for attempt in range(self.retries + 1):
+            try:
+                self._synthesize(text, tmp)
+                os.replace(tmp, path)
+                self._count("synthesized")
+                return path
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self._count("retries")
+                time.sleep(0.5 * 2 ** attempt)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def clips(self, texts):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self.clip, texts))
+
+    def prune(self):
+        cutoff = time.time() - self.keep_days * 86400
+        for p in glob.glob(os.path.join(self.cache_dir, "*", "*.mp3")):
+            if os.path.getmtime(p) < cutoff:
+                os.remove(p)
+
+    def summary(self):
+        s = self.stats
+        return "cache_hit=%d synthesized=%d retries=%d" % (s["cache_hit"], s["synthesized"], s["retries"])
+
+def synthesize_segments(script, out, synth):
+    """
+    按 generate_script 的分段合成（缓存命中的段直接复用，其余并行合成），流复制拼接成完整旁白，
+    并在旁边写出 <out>.timing.json（每段起点与时长），供 generate_video 对齐幻灯片
+    """
+    segments = script["segments"]
+    clips = synth.clips([seg["text"] for seg in segments])
+    timing, start = [], 0.0
+    for seg, clip in zip(segments, clips):
+        duration = media_duration(clip)
+        timing.append(dict((key, seg[key]) for key in ("id", "kind", "index") if key in seg))
+        timing[-1].update(clip=clip, start=round(start, 3), duration=round(duration, 3))
+        start += duration
+    concat_copy(clips, out)
+    with open(os.path.splitext(out)[0] + ".timing.json", "w", encoding="utf-8") as f:
+        json.dump({"audio": out, "news": script.get("news", ""), "total": round(start, 3),
+                   "segments": timing}, f, ensure_ascii=False, indent=2)
+    return timing
+
 def main():
     t = latest("output/text/*.txt")
     if not t:
         print("no txt found"); return
-    with open(t, "r", encoding="utf-8") as f:
-        text = f.read()
-
-    tts = gTTS(text=text, lang="zh-CN")
     date_str = get_today_str()
     out = f"output/audio/{date_str}.mp3"
-    tts.save(out)
+    synth = SegmentSynth(**load_tts_options())
+
+    seg_json = os.path.splitext(t)[0] + ".segments.json"
+    if os.path.exists(seg_json):
+        with open(seg_json, "r", encoding="utf-8") as f:
+            script = json.load(f)
+        timing = synthesize_segments(script, out, synth)
+        synth.prune()
+        print(f"[OK] audio -> %s (%d segments, %.1fs; %s)" % (
+            out, len(timing), sum(x["duration"] for x in timing), synth.summary()))
+        return
+
+    # 旧版文案（无分段信息）：整段合成
+    with open(t, "r", encoding="utf-8") as f:
+        text = f.read()
+    concat_copy([synth.clip(text)], out)
+    stale = os.path.splitext(out)[0] + ".timing.json"
+    if os.path.exists(stale):
+        os.remove(stale)
     print(f"[OK] audio -> %s" % out)
 
 if __name__ == "__main__":
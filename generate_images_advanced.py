@@ -4,13 +4,19 @@
 高级AI新闻图片生成器
 支持多种图片生成方案：MCP、在线API、本地生成
 """
-import os, json, glob, datetime, hashlib, time
+import os, json, glob, datetime, hashlib, time, argparse
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
-import random, requests
+import random, requests, yaml
 from dateutil.tz import tzlocal
 import subprocess
 import base64
 from io import BytesIO
+import news_io
+from render_utils import radial_gradient, ShapeLayer, get_font, wrap_text
+from keywords import get_lexicon
+from diffusion_worker import get_worker
+from image_backend import open_client
 
 # 配置
 W, H = 1080, 1920  # 竖屏尺寸
@@ -27,30 +33,9 @@ def get_today_str():
 
 def translate_to_english_prompt(chinese_text):
     """将中文新闻转换为英文图片生成提示词"""
-    # 简单的关键词映射
-    keyword_map = {
-        "OpenAI": "OpenAI artificial intelligence",
-        "GPT": "GPT language model technology",
-        "Anthropic": "Anthropic AI company",
-        "Claude": "Claude AI assistant",
-        "机器人": "advanced robotics technology",
-        "人工智能": "artificial intelligence AI",
-        "MIT": "MIT university research laboratory",
-        "导航": "navigation autonomous system",
-        "算法": "algorithm computer science",
-        "深度学习": "deep learning neural network",
-        "数据": "data analytics technology",
-        "科技": "technology innovation",
-        "研发": "research development laboratory",
-        "突破": "breakthrough innovation",
-        "发布": "product launch announcement"
-    }
-    
-    # 构建英文提示词
-    prompt_parts = []
-    for chinese, english in keyword_map.items():
-        if chinese in chinese_text:
-            prompt_parts.append(english)
+    # 关键词映射见 keywords.py / config.yaml 的 lexicon.prompts
+    lexicon = get_lexicon()
+    prompt_parts = [lexicon.prompts[key] for key in lexicon.tag(chinese_text)["prompts"]]
     
     if not prompt_parts:
         prompt_parts = ["artificial intelligence", "technology innovation"]
@@ -65,85 +50,30 @@ def translate_to_english_prompt(chinese_text):
     prompt = ", ".join(prompt_parts[:3] + style_keywords[:4])
     return prompt
 
-def generate_with_stability_api(prompt, output_path):
-    """使用Stability AI API生成图片 (需要API key)"""
+def load_config():
     try:
-        api_key = os.getenv("STABILITY_API_KEY")
-        if not api_key:
-            return False
-            
-        url = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"
-        
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        data = {
-            "text_prompts": [
-                {
-                    "text": prompt,
-                    "weight": 1
-                }
-            ],
-            "cfg_scale": 7,
-            "height": 1920,
-            "width": 1080,
-            "samples": 1,
-            "steps": 30,
-        }
-        
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data["artifacts"]:
-                image_data = base64.b64decode(data["artifacts"][0]["base64"])
-                with open(output_path, "wb") as f:
-                    f.write(image_data)
-                return True
-        
-        return False
-        
-    except Exception as e:
-        print(f"  ❌ Stability API错误: {e}")
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except Exception:
+        return {}
+
+def generate_with_stability_api(prompt, output_path):
+    """使用Stability AI API生成图片 (需要API key)；批量生成见 main 中的并发客户端"""
+    if not remote_backend_enabled():
         return False
+    res = open_client(load_config()).run([(output_path, prompt, output_path)])[0]
+    if not res.ok:
+        print(f"  ❌ Stability API错误: {res.error}")
+    return res.ok
 
 def generate_with_local_diffusion(prompt, output_path):
-    """使用本地Stable Diffusion生成图片 (如果已安装)"""
-    try:
-        # 检查是否安装了diffusers
-        import torch
-        from diffusers import StableDiffusionPipeline
-        
-        # 加载模型 (首次运行会下载，需要时间)
-        pipe = StableDiffusionPipeline.from_pretrained(
-            "runwayml/stable-diffusion-v1-5",
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
-        )
-        
-        if torch.cuda.is_available():
-            pipe = pipe.to("cuda")
-        
-        # 生成图片
-        image = pipe(
-            prompt,
-            height=1920,
-            width=1080,
-            num_inference_steps=20,
-            guidance_scale=7.5
-        ).images[0]
-        
-        image.save(output_path)
+    """使用本地Stable Diffusion生成图片 (如果已安装)；管线在进程内常驻，见 diffusion_worker.py"""
+    worker = get_worker((W, H))
+    if worker.render([(prompt, output_path)])[0]:
         return True
-        
-    except ImportError:
-        print("  ⚠️ 未安装diffusers库，跳过本地Stable Diffusion")
-        return False
-    except Exception as e:
-        print(f"  ❌ 本地Diffusion错误: {e}")
-        return False
+    if worker.error:
+        print(f"  ⚠️ 跳过本地Stable Diffusion: {worker.error}")
+    return False
 
 def create_enhanced_local_image(title, summary, source, output_path):
     """增强版本地图片生成"""
@@ -162,46 +92,24 @@ def create_enhanced_local_image(title, summary, source, output_path):
     else:
         colors = [(14, 165, 233), (2, 132, 199)]  # 默认蓝色
     
-    # 创建渐变背景
-    img = Image.new('RGB', (W, H), colors[0])
-    
-    # 创建复杂渐变
-    for y in range(H):
-        for x in range(W):
-            # 径向渐变效果
-            center_x, center_y = W//3, H//4
-            distance = ((x - center_x)**2 + (y - center_y)**2)**0.5
-            max_distance = (W**2 + H**2)**0.5
-            ratio = min(distance / max_distance * 2, 1.0)
-            
-            r = int(colors[0][0] * (1 - ratio) + colors[1][0] * ratio)
-            g = int(colors[0][1] * (1 - ratio) + colors[1][1] * ratio)
-            b = int(colors[0][2] * (1 - ratio) + colors[1][2] * ratio)
-            
-            img.putpixel((x, y), (r, g, b))
-    
-    # 添加科技感图案
-    draw = ImageDraw.Draw(img)
+    # 创建渐变背景（径向渐变，NumPy 向量化）
+    img = radial_gradient(W, H, colors, (W//3, H//4), (W**2 + H**2)**0.5, scale=2)
     
-    # 添加几何图形
+    # 添加几何图形：所有图形画在同一个共享图层的局部小块上，最后只混合一次
+    shapes = ShapeLayer((W, H))
     for i in range(8):
         x = random.randint(0, W)
         y = random.randint(0, H//2)
         size = random.randint(30, 120)
         alpha = random.randint(10, 40)
         
-        # 创建半透明图层
-        overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-        overlay_draw = ImageDraw.Draw(overlay)
-        
         # 随机几何形状
         shape_type = random.choice(['circle', 'rectangle', 'triangle'])
         if shape_type == 'circle':
-            overlay_draw.ellipse([x, y, x+size, y+size], fill=(255, 255, 255, alpha))
+            shapes.ellipse([x, y, x+size, y+size], fill=(255, 255, 255, alpha))
         elif shape_type == 'rectangle':
-            overlay_draw.rectangle([x, y, x+size, y+size//2], fill=(255, 255, 255, alpha))
-        
-        img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
+            shapes.rectangle([x, y, x+size, y+size//2], fill=(255, 255, 255, alpha))
+    img = shapes.flatten(img)
     
     # 添加网格线条
     draw = ImageDraw.Draw(img)
@@ -233,38 +141,19 @@ def create_enhanced_local_image(title, summary, source, output_path):
     # 添加文字
     draw = ImageDraw.Draw(img)
     
-    # 加载字体
-    try:
-        font_large = ImageFont.truetype(FONT_PATH, 64)
-        font_medium = ImageFont.truetype(FONT_PATH, 42)
-        font_small = ImageFont.truetype(FONT_PATH, 32)
-    except:
-        font_large = ImageFont.load_default()
-        font_medium = ImageFont.load_default()
-        font_small = ImageFont.load_default()
+    # 加载字体（进程级缓存，字体文件只解析一次）
+    font_large = get_font(FONT_PATH, 64)
+    font_medium = get_font(FONT_PATH, 42)
+    font_small = get_font(FONT_PATH, 32)
     
     # 品牌标识
     draw.text((60, 60), "AI科技资讯", font=font_medium, fill=(255, 255, 255), stroke_width=2, stroke_fill=(0,0,0))
     draw.text((60, 120), f"📰 {source}", font=font_small, fill=(200, 200, 200))
     
-    # 主标题处理
+    # 主标题处理：按像素宽度换行
     y_pos = H*2//3 + 60
-    title_lines = []
-    
-    # 智能换行
-    if len(title) > 16:
-        # 寻找合适的断点
-        break_chars = "，。！？、"
-        best_break = len(title) // 2
-        
-        for i in range(len(title)//2 - 5, len(title)//2 + 5):
-            if i < len(title) and title[i] in break_chars:
-                best_break = i + 1
-                break
-        
-        title_lines = [title[:best_break].strip(), title[best_break:].strip()]
-    else:
-        title_lines = [title]
+    text_width = W - 120
+    title_lines = wrap_text(title, font_large, text_width, max_lines=3)
     
     # 绘制标题
     for i, line in enumerate(title_lines):
@@ -272,10 +161,11 @@ def create_enhanced_local_image(title, summary, source, output_path):
             draw.text((60, y_pos + i * 85), line, font=font_large, fill=(255, 255, 255), 
                      stroke_width=1, stroke_fill=(0,0,0))
     
-    # 摘要
+    # 摘要：填满底部剩余空间
     y_pos += len(title_lines) * 85 + 30
-    summary_text = summary[:80] + "..." if len(summary) > 80 else summary
-    draw.text((60, y_pos), summary_text, font=font_medium, fill=(220, 220, 220))
+    summary_lines = wrap_text(summary, font_medium, text_width, max_lines=max(1, (H - 80 - y_pos) // 52))
+    for i, line in enumerate(summary_lines):
+        draw.text((60, y_pos + i * 52), line, font=font_medium, fill=(220, 220, 220))
     
     # 添加装饰元素
     draw.ellipse([(W-150, 50), (W-50, 150)], outline=(255, 255, 255, 100), width=3)
@@ -286,20 +176,20 @@ def create_enhanced_local_image(title, summary, source, output_path):
     final_img.save(output_path, quality=95, optimize=True)
     return True
 
-def generate_news_image_advanced(title, summary, source, output_path):
-    """高级图片生成，尝试多种方案"""
+def generate_news_image_advanced(title, summary, source, output_path, use_remote=True, use_diffusion=True):
+    """高级图片生成，尝试多种方案；use_remote / use_diffusion=False 时跳过对应方案（已由批量预生成处理过）"""
     print(f"  🎨 生成图片: {title[:30]}...")
     
     # 方案1: 尝试在线API (如果配置了)
     english_prompt = translate_to_english_prompt(title + " " + summary)
     print(f"  📝 英文提示词: {english_prompt}")
     
-    if generate_with_stability_api(english_prompt, output_path):
+    if use_remote and generate_with_stability_api(english_prompt, output_path):
         print(f"  ✅ Stability AI生成成功")
         return True
     
     # 方案2: 尝试本地Stable Diffusion
-    if generate_with_local_diffusion(english_prompt, output_path):
+    if use_diffusion and generate_with_local_diffusion(english_prompt, output_path):
         print(f"  ✅ 本地Diffusion生成成功")
         return True
     
@@ -311,18 +201,38 @@ def generate_news_image_advanced(title, summary, source, output_path):
     print(f"  ❌ 所有图片生成方案失败")
     return False
 
+def remote_backend_enabled():
+    """是否会调用在线 API（目前仅 Stability AI，需配置 API key）"""
+    return bool(os.getenv("STABILITY_API_KEY"))
+
+def render_item(job):
+    """生成单条新闻图片（可在子进程中运行），返回 (序号, 输出路径；失败为空串)"""
+    i, title, summary, source, output_path, use_remote, use_diffusion = job
+    # 每条新闻固定随机种子，本地生成的装饰元素可复现
+    random.seed(int(hashlib.md5(title.encode()).hexdigest()[:8], 16))
+    try:
+        ok = generate_news_image_advanced(title, summary, source, output_path, use_remote, use_diffusion)
+    except Exception as e:
+        print(f"  ❌ 生成失败: {title[:30]} ({e})")
+        ok = False
+    return i, output_path if ok else ""
+
 def main():
     """主函数"""
+    ap = argparse.ArgumentParser(description="高级AI新闻图片生成器")
+    ap.add_argument("--workers", type=int, default=1, help="并行生成的进程数（默认 1，串行）")
+    ap.add_argument("--no-diffusion", action="store_true", help="不使用本地 Stable Diffusion")
+    args = ap.parse_args()
+
     print("🚀 启动高级AI新闻图片生成器...")
     
     # 获取新闻数据
-    news_json = latest("output/news/*.json")
+    news_json = news_io.latest_news()
     if not news_json:
         print("❌ 未找到新闻数据")
         return
     
-    with open(news_json, "r", encoding="utf-8") as f:
-        items = json.load(f)
+    items = news_io.load_items(news_json)
     
     if not items:
         print("❌ 新闻数据为空")
@@ -333,8 +243,7 @@ def main():
     
     print(f"📰 处理 {len(items)} 条新闻...")
     
-    # 生成图片
-    success_count = 0
+    jobs = []
     for i, item in enumerate(items):
         title = item.get("title", "")
         summary = item.get("summary", "")
@@ -346,22 +255,55 @@ def main():
         # 生成文件名
         filename = f"ai_news_{i+1}_{hashlib.md5(title.encode()).hexdigest()[:8]}.jpg"
         output_path = f"assets/ai_generated_images/{filename}"
-        
-        if generate_news_image_advanced(title, summary, source, output_path):
-            item["image_path"] = output_path
+        jobs.append((i, title, summary, source, output_path, False, False))
+    prompts = {j[0]: translate_to_english_prompt(j[1] + " " + j[2]) for j in jobs}
+    done = []
+    
+    # 方案1：在线 API 并发请求（限并发、带退避重试与总时限），按完成顺序收集
+    if jobs and remote_backend_enabled():
+        def report(res):
+            mark = "✅" if res.ok else "❌"
+            print(f"  {mark} 在线API: {os.path.basename(res.output_path)} "
+                  f"({res.elapsed:.1f}s, {res.attempts} 次{', ' + res.error if res.error else ''})")
+        client = open_client(load_config())
+        ok = {res.key for res in client.run([(j[0], prompts[j[0]], j[4]) for j in jobs], report) if res.ok}
+        done += [j for j in jobs if j[0] in ok]
+        jobs = [j for j in jobs if j[0] not in ok]
+    
+    # 方案2：本地 Diffusion 在主进程内按批次一次生成（模型只加载一次），子进程不再各自加载模型
+    worker = get_worker((W, H))
+    if jobs and not args.no_diffusion:
+        ok = worker.render([(prompts[j[0]], j[4]) for j in jobs])
+        done += [j for j, good in zip(jobs, ok) if good]
+        jobs = [j for j, good in zip(jobs, ok) if not good]
+        if worker.error:
+            print(f"  ⚠️ 跳过本地Stable Diffusion: {worker.error}")
+    
+    # 方案3：其余新闻逐条本地绘制
+    # 生成图片：文件名由序号与标题决定，结果按原顺序写回 JSON
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(render_item, jobs))
+    else:
+        results = [render_item(job) for job in jobs]
+    
+    results = [(j[0], j[4]) for j in done] + results
+    success_count = 0
+    for i, output_path in results:
+        if output_path:
+            items[i]["image_path"] = output_path
             success_count += 1
         else:
             # 备用：使用占位图片
-            item["image_path"] = "assets/placeholder.jpg"
-        
-        time.sleep(1)  # 避免API限制
+            items[i]["image_path"] = "assets/placeholder.jpg"
     
     # 保存更新的新闻数据
-    with open(news_json, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    news_io.save_items(news_json, items)
     
     print(f"✅ 完成！成功生成 {success_count}/{len(items)} 张图片")
     print(f"📁 图片保存在: assets/ai_generated_images/")
+    if not worker.error:
+        print(f"🖼️ 本地Diffusion: {worker.summary()}")
 
 if __name__ == "__main__":
     main()
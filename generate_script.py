@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import os, json, glob, datetime
 from dateutil.tz import tzlocal
+import news_io
 
 def latest(path):
     files = sorted(glob.glob(path), reverse=True)
@@ -13,26 +14,30 @@ def get_today_str():
     return now.astimezone().strftime("%Y-%m-%d")
 
 def main():
-    j = latest("output/news/*.json")
+    j = news_io.latest_news()
     if not j:
         print("no news json found"); return
-    with open(j, "r", encoding="utf-8") as f:
-        items = json.load(f)
+    items = news_io.load_items(j)
 
     date_str = get_today_str()
-    lines = []
-    lines.append(f"大家好，这里是每日AI速览，今天是 {date_str}。我们用一分钟带你了解AI圈要闻。")
+    # 结构化分段：开场、每条新闻一段、结尾；story 段的 index 对应新闻 JSON 中的序号（即视频幻灯片）
+    segments = [{"id": "intro", "kind": "intro",
+                 "text": f"大家好，这里是每日AI速览，今天是 {date_str}。我们用一分钟带你了解AI圈要闻。"}]
     for i, it in enumerate(items, 1):
         title = it.get("title","").strip()
         summ = it.get("summary","").strip()
         src  = it.get("source","")
-        lines.append(f"{i}）【{src}】{title}。简要：{summ}。")
-    lines.append("以上就是今天的AI要闻。想看更详细的内容，欢迎在评论区留言，我们下期见。")
+        segments.append({"id": f"story-{i}", "kind": "story", "index": i - 1,
+                         "text": f"{i}）【{src}】{title}。简要：{summ}。"})
+    segments.append({"id": "outro", "kind": "outro",
+                     "text": "以上就是今天的AI要闻。想看更详细的内容，欢迎在评论区留言，我们下期见。"})
 
     out = f"output/text/{date_str}.txt"
     with open(out, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-    print(f"[OK] script -> %s" % out)
+        f.write("\n".join(seg["text"] for seg in segments))
+    with open(f"output/text/{date_str}.segments.json", "w", encoding="utf-8") as f:
+        json.dump({"news": j, "segments": segments}, f, ensure_ascii=False, indent=2)
+    print(f"[OK] script -> %s (%d segments)" % (out, len(segments)))
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, json, glob, datetime
+import os, json, glob, time, datetime, hashlib, tempfile, subprocess, argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from moviepy.editor import ImageClip, CompositeVideoClip, concatenate_videoclips, AudioFileClip
 from PIL import Image, ImageFont, ImageDraw
+import numpy as np
 from dateutil.tz import tzlocal
+import news_io
+from ffmpeg_utils import ffmpeg_exe, media_duration
+from render_utils import get_font, wrap_text
 
 W, H = 1080, 1920  # 竖屏
+# 静态幻灯片的输入帧率：每张图只按该帧率读入、转换色彩空间，再由输出端按输出帧率（默认 30 fps）复制帧。
+# 更低的输出帧率（如 --still-fps 5）编码更快，但会改变成片帧率，需显式开启
+STILL_INPUT_FPS = 1
 FONT = os.getenv("CJK_FONT_PATH", "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc")
+SCALED_SUFFIX = ".w1080.jpg"  # fetch_news 下载配图时预生成的 1080 宽版本
+
+# 分段编码：每张幻灯片单独编码成无音轨片段，按内容哈希缓存，最后流复制拼接。
+# 修改幻灯片版式或编码参数时递增 SEGMENT_VERSION，旧片段即失效
+SEGMENT_VERSION = 1
+SEGMENT_DIR = "cache/segments"
+SEGMENT_KEEP_DAYS = 7     # 超过该天数未被使用的片段会被清理
+X264_ARGS = ["-c:v", "libx264", "-preset", "medium", "-tune", "stillimage",
+             "-pix_fmt", "yuv420p", "-video_track_timescale", "90000"]
 
 def latest(path):
     files = sorted(glob.glob(path), reverse=True)
@@ -17,10 +34,16 @@ def get_today_str():
     now = datetime.datetime.now(tz)
     return now.astimezone().strftime("%Y-%m-%d")
 
-def make_slide(img_path, title, summary, duration=4.0):
+def scaled_variant(img_path):
+    p = os.path.splitext(img_path)[0] + SCALED_SUFFIX
+    return p if os.path.exists(p) else img_path
+
+def compose_slide(img_path, title, summary):
+    """合成一张幻灯片，返回 RGB 图像（不落盘，可在多个线程/进程中并行调用）"""
     if not img_path or not os.path.exists(img_path):
         bg = Image.new("RGB", (W, H), (18,18,18))
     else:
+        img_path = scaled_variant(img_path)
         im = Image.open(img_path).convert("RGB")
         if im.width != W:
             im = im.resize((W, int(im.height * W / im.width)))
@@ -32,13 +55,8 @@ def make_slide(img_path, title, summary, duration=4.0):
             top = (im.height - H)//2
             bg = im.crop((0, top, W, top+H))
 
-    draw = ImageDraw.Draw(bg)
-    try:
-        font_title = ImageFont.truetype(FONT, 54)
-        font_body  = ImageFont.truetype(FONT, 40)
-    except:
-        font_title = ImageFont.load_default()
-        font_body  = ImageFont.load_default()
+    font_title = get_font(FONT, 54)
+    font_body  = get_font(FONT, 40)
 
     overlay = Image.new("RGBA", (W, H), (0,0,0,0))
     odraw = ImageDraw.Draw(overlay)
@@ -46,33 +64,212 @@ def make_slide(img_path, title, summary, duration=4.0):
     bg = Image.alpha_composite(bg.convert("RGBA"), overlay)
     draw = ImageDraw.Draw(bg)
 
+    # 按像素宽度换行，标题最多 3 行，摘要填满剩余区域
     margin = 60
-    draw.text((margin, int(H*0.58)), title[:80], font=font_title, fill=(255,255,255,255))
-    draw.text((margin, int(H*0.58)+90), summary[:180], font=font_body, fill=(220,220,220,255))
-    temp = "temp_slide.jpg"
-    bg.convert("RGB").save(temp, quality=92)
-    clip = ImageClip(temp).set_duration(duration)
-    return clip
+    y = int(H*0.58)
+    for line in wrap_text(title, font_title, W - 2*margin, max_lines=3):
+        draw.text((margin, y), line, font=font_title, fill=(255,255,255,255))
+        y += 72
+    y += 18
+    for line in wrap_text(summary, font_body, W - 2*margin, max_lines=max(1, (H - 80 - y) // 56)):
+        draw.text((margin, y), line, font=font_body, fill=(220,220,220,255))
+        y += 56
+    return bg.convert("RGB")
+
+def make_slide(img_path, title, summary, duration=4.0):
+    # 直接以内存中的数组构建片段，省去临时 JPEG 的编解码，也不会与其他渲染互相覆盖
+    frame = np.asarray(compose_slide(img_path, title, summary))
+    return ImageClip(frame).set_duration(duration)
+
+def audio_duration(path):
+    return media_duration(path)
+
+def slide_durations(news_json, audio_mp3, n, min_total=12):
+    """
+    generate_audio 写出的 <audio>.timing.json 记录了每段旁白的实际时长与总时长：
+    每张幻灯片的时长取对应新闻段，开场并入第一张、结尾并入最后一张，无需再探测音频；
+    没有计时文件或与新闻不对应时才读取音频时长并平均分配。总时长至少 min_total 秒
+    """
+    timing_path = os.path.splitext(audio_mp3)[0] + ".timing.json"
+    if os.path.exists(timing_path):
+        with open(timing_path, "r", encoding="utf-8") as f:
+            timing = json.load(f)
+        segs = timing.get("segments", [])
+        stories = {seg["index"]: seg["duration"] for seg in segs if seg["kind"] == "story"}
+        if timing.get("news") == news_json and sorted(stories) == list(range(n)):
+            durs = [stories[k] for k in range(n)]
+            durs[0] += sum(seg["duration"] for seg in segs if seg["kind"] == "intro")
+            durs[-1] += sum(seg["duration"] for seg in segs if seg["kind"] == "outro")
+            total = max(min_total, timing.get("total", 0.0))
+            durs[-1] += max(0.0, total - sum(durs))
+            return durs
+        print("[WARN] 旁白计时与新闻不对应，幻灯片平均分配时长")
+    total = max(min_total, audio_duration(audio_mp3))
+    return [total / n] * n
+
+def render_moviepy(slides, durations, audio_path, out, fps=30):
+    """原路径：moviepy 逐帧合成并经管道送入 ffmpeg"""
+    clips = [make_slide(img, title, summ, d) for (img, title, summ), d in zip(slides, durations)]
+    video = concatenate_videoclips(clips, method="compose").set_audio(AudioFileClip(audio_path))
+    video.write_videofile(out, fps=fps, codec="libx264", audio_codec="aac", threads=4, preset="medium")
+
+def render_ffmpeg(slides, durations, audio_path, out, fps=30):
+    """
+    静态幻灯片快速路径：幻灯片写成 PNG 放在本次渲染独占的临时目录，
+    用 concat demuxer 按各自时长拼接（每张只解码、转换色彩空间一次），
+    fps 滤镜复制到输出帧率后经 x264 -tune stillimage 编码，音频同一遍混入
+    """
+    exe = ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg not found")
+    with tempfile.TemporaryDirectory(prefix="slides-") as tmp:
+        def write(job):
+            k, (img, title, summ) = job
+            path = os.path.join(tmp, "slide_%03d.png" % k)
+            compose_slide(img, title, summ).save(path, compress_level=1)
+            return path
+        with ThreadPoolExecutor(max_workers=min(4, len(slides))) as pool:
+            paths = list(pool.map(write, enumerate(slides)))
+        lines = ["ffconcat version 1.0"]
+        for path, d in zip(paths, durations):
+            lines += ["file '%s'" % os.path.basename(path), "duration %.3f" % d]
+        lines.append("file '%s'" % os.path.basename(paths[-1]))  # concat demuxer 需重复末张才会采用其时长
+        listing = os.path.join(tmp, "slides.ffconcat")
+        with open(listing, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        cmd = [exe, "-y", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", listing,
+               "-i", audio_path,
+               "-map", "0:v", "-map", "1:a",
+               "-vf", "format=yuv420p,fps=%d" % fps,
+               "-c:v", "libx264", "-preset", "medium", "-tune", "stillimage",
+               "-c:a", "aac", "-b:a", "128k",
+               "-t", "%.3f" % sum(durations),
+               "-movflags", "+faststart", out]
+        subprocess.run(cmd, check=True)
+
+def segment_key(slide, frames, fps):
+    """片段内容哈希：配图文件（路径、大小、修改时间）、文字、帧数与编码参数"""
+    img, title, summ = slide
+    parts = ["v%d" % SEGMENT_VERSION, "%dx%d" % (W, H), str(fps), str(frames), " ".join(X264_ARGS), title, summ]
+    if img and os.path.exists(img):
+        img = scaled_variant(img)
+        st = os.stat(img)
+        parts += [os.path.abspath(img), str(st.st_size), str(st.st_mtime_ns)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:24]
+
+def encode_segment(job):
+    """在子进程中合成并编码一张幻灯片；先写临时文件再原子替换"""
+    exe, (img, title, summ), frames, fps, path = job
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    png = tmp + ".png"
+    try:
+        compose_slide(img, title, summ).save(png, compress_level=1)
+        # 以低帧率读入静态图，-r 复制到输出帧率，-frames:v 按输出帧数截断
+        cmd = [exe, "-y", "-loglevel", "error", "-loop", "1", "-framerate", str(STILL_INPUT_FPS), "-i", png,
+               "-frames:v", str(frames), "-r", str(fps), "-an"] + X264_ARGS + ["-f", "mp4", tmp]
+        subprocess.run(cmd, check=True)
+        os.replace(tmp, path)
+    finally:
+        for p in (png, tmp):
+            if os.path.exists(p):
+                os.remove(p)
+    return path
+
+def prune_segments(keep, seg_dir=SEGMENT_DIR, days=SEGMENT_KEEP_DAYS):
+    cutoff = time.time() - days * 86400
+    for p in glob.glob(os.path.join(seg_dir, "*.mp4")):
+        if p not in keep and os.path.getmtime(p) < cutoff:
+            os.remove(p)
+
+def render_segments(slides, durations, audio_path, out, fps=30, workers=0, seg_dir=SEGMENT_DIR):
+    """
+    分段路径：缺失的片段在进程池中并行编码（编码参数一致），
+    已有片段直接复用，最后 concat demuxer 流复制视频、同一遍编码音频，视频不再重编码。
+    返回 (复用数, 编码数)
+    """
+    exe = ffmpeg_exe()
+    if not exe:
+        raise RuntimeError("ffmpeg not found")
+    os.makedirs(seg_dir, exist_ok=True)
+    # 每段按自身时长取整到帧（不按累计时长取整），同一条新闻时长不变时帧数不变，片段可复用；
+    # 每段误差不超过半帧，总长由拼接时的 -t 截齐
+    frames = [max(1, int(round(d * fps))) for d in durations]
+    paths = [os.path.join(seg_dir, segment_key(sl, n, fps) + ".mp4") for sl, n in zip(slides, frames)]
+    todo, queued = [], set()
+    for sl, n, p in zip(slides, frames, paths):
+        if not os.path.exists(p) and p not in queued:
+            queued.add(p)
+            todo.append((exe, sl, n, fps, p))
+    workers = workers or os.cpu_count() or 1
+    if len(todo) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            list(pool.map(encode_segment, todo))
+    else:
+        for job in todo:
+            encode_segment(job)
+    now = time.time()
+    for p in set(paths):
+        os.utime(p, (now, now))
+    with tempfile.TemporaryDirectory(prefix="segments-") as tmp:
+        listing = os.path.join(tmp, "segments.ffconcat")
+        with open(listing, "w", encoding="utf-8") as f:
+            f.write("ffconcat version 1.0\n" + "".join("file '%s'\n" % os.path.abspath(p) for p in paths))
+        cmd = [exe, "-y", "-loglevel", "error",
+               "-f", "concat", "-safe", "0", "-i", listing,
+               "-i", audio_path,
+               "-map", "0:v", "-map", "1:a",
+               "-c:v", "copy", "-c:a", "aac", "-b:a", "128k",
+               "-t", "%.3f" % sum(durations),
+               "-movflags", "+faststart", out]
+        subprocess.run(cmd, check=True)
+    prune_segments(set(paths), seg_dir)
+    return len(slides) - len(todo), len(todo)
+
+def render_video(slides, durations, audio_path, out, renderer="auto", fps=30, still_fps=None, workers=0):
+    """
+    renderer: auto（分段编码，失败时回退 moviepy）| segments | ffmpeg（整段单次编码）| moviepy；
+    still_fps 给出时 segments / ffmpeg 路径改用该输出帧率，否则与 fps 相同。返回实际使用的渲染器
+    """
+    still_fps = still_fps or fps
+    if renderer in ("auto", "segments"):
+        try:
+            reused, encoded = render_segments(slides, durations, audio_path, out, still_fps, workers)
+            print(f"[OK] segments: reused={reused} encoded={encoded}")
+            return "segments"
+        except Exception as e:
+            if renderer == "segments":
+                raise
+            print(f"[WARN] 分段编码失败，回退 moviepy: {e}")
+    elif renderer == "ffmpeg":
+        render_ffmpeg(slides, durations, audio_path, out, still_fps)
+        return "ffmpeg"
+    render_moviepy(slides, durations, audio_path, out, fps)
+    return "moviepy"
 
 def main():
-    news_json = latest("output/news/*.json")
+    ap = argparse.ArgumentParser(description="合成新闻视频")
+    ap.add_argument("--renderer", choices=["auto", "segments", "ffmpeg", "moviepy"], default="auto",
+                    help="auto：分段并行编码并复用未变化的片段，失败时回退 moviepy")
+    ap.add_argument("--fps", type=int, default=30, help="输出帧率")
+    ap.add_argument("--still-fps", type=int, default=None,
+                    help="segments / ffmpeg 路径改用的低输出帧率（如 5，编码更快）；默认与 --fps 相同")
+    ap.add_argument("--workers", type=int, default=0, help="分段编码的进程数（默认 CPU 核数）")
+    args = ap.parse_args()
+
+    news_json = news_io.latest_news()
     audio_mp3 = latest("output/audio/*.mp3")
     if not (news_json and audio_mp3):
         print("missing inputs"); return
-    with open(news_json, "r", encoding="utf-8") as f:
-        items = json.load(f)
+    items = news_io.load_items(news_json)
 
-    n = max(1, len(items))
-    audio = AudioFileClip(audio_mp3)
-    total = max(12, audio.duration)  # 至少 12 秒
-    per = total / n
+    slides = [(it.get("image_path",""), it.get("title",""), it.get("summary","")) for it in items] or [("", "", "")]
+    durations = slide_durations(news_json, audio_mp3, len(slides))
 
-    clips = [make_slide(it.get("image_path",""), it.get("title",""), it.get("summary",""), per) for it in items]
-    video = concatenate_videoclips(clips, method="compose").set_audio(audio)
     date_str = get_today_str()
     out = f"output/video/{date_str}.mp4"
-    video.write_videofile(out, fps=30, codec="libx264", audio_codec="aac", threads=4, preset="medium")
-    print(f"[OK] video -> %s" % out)
+    used = render_video(slides, durations, audio_mp3, out, args.renderer, args.fps, args.still_fps, args.workers)
+    print(f"[OK] video -> %s (%s)" % (out, used))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 会话
+所有抓取路径（RSS、列表页、文章页、图片）共用一个 keep-alive 连接池，
+避免对同一批站点反复进行 TCP+TLS 握手
+"""
+import os, re, json, time, hashlib, threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fetch_metrics import METRICS
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+TIMEOUT = 12
+
+# 连接池默认值，可在 config.yaml 的 http 段覆盖
+HTTP_DEFAULTS = {
+    "pool_size": 4,   # 每个 host 的默认连接池大小
+    "pools": {},      # 按域名覆盖，如 {"www.qbitai.com": 6}
+    "retries": 2,     # 连接错误与 429/5xx 的重试次数
+    "cache": {},      # 条件请求缓存，见 CACHE_DEFAULTS
+}
+
+CACHE_DEFAULTS = {
+    "dir": "cache/http",
+    "ttl": 600,       # 响应未给出 Cache-Control: max-age 时的新鲜期（秒）
+    "max_mb": 50,     # 磁盘占用上限，超出后按最近访问时间淘汰
+}
+
+_lock = threading.Lock()
+_session = None
+_opts = dict(HTTP_DEFAULTS)
+_cache = None
+
+def configure(cfg=None):
+    """根据 config.yaml 的 http 段重建会话与缓存"""
+    global _session, _opts, _cache
+    with _lock:
+        _opts = dict(HTTP_DEFAULTS, **((cfg or {}).get("http") or {}))
+        if _session is not None:
+            _session.close()
+        _session = None
+        _cache = None
+
+def _build_session():
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    size = int(_opts["pool_size"])
+    retry = Retry(total=int(_opts["retries"]), backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+    default = HTTPAdapter(pool_connections=16, pool_maxsize=size, max_retries=retry)
+    s.mount("http://", default)
+    s.mount("https://", default)
+    # 按域名挂载独立适配器，单独设置池大小（requests 以最长前缀匹配）
+    for host, n in (_opts.get("pools") or {}).items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(n), max_retries=retry)
+        s.mount(f"http://{host}/", adapter)
+        s.mount(f"https://{host}/", adapter)
+    return s
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+def get(url, **kw):
+    kw.setdefault("timeout", TIMEOUT)
+    t0 = time.perf_counter()
+    try:
+        resp = get_session().get(url, **kw)
+    except Exception as e:
+        METRICS.record_request(url, time.perf_counter() - t0, error=type(e).__name__)
+        raise
+    # 流式响应此时尚未读取正文，字节数取 Content-Length
+    if kw.get("stream"):
+        nbytes = int(resp.headers.get("Content-Length") or 0)
+    else:
+        nbytes = len(resp.content)
+    history = getattr(getattr(resp.raw, "retries", None), "history", None) or ()
+    METRICS.record_request(url, time.perf_counter() - t0, resp.status_code, nbytes, len(history),
+                           "" if resp.ok or resp.status_code == 304 else "HTTP%d" % resp.status_code)
+    return resp
+
+def get_html(url, **kw):
+    """
+    页面 HTML：响应头声明了 charset 时返回按其解码的 str，否则返回原始 bytes，
+    由调用方按 <meta charset> 识别（requests 对未声明 charset 的 text/html 一律按 ISO-8859-1 解码）
+    """
+    resp = get(url, **kw)
+    resp.raise_for_status()
+    if "charset" in resp.headers.get("Content-Type", "").lower():
+        return resp.text
+    return resp.content
+
+class HTTPCache:
+    """
+    磁盘 HTTP 缓存（条件请求）
+    新鲜期内直接返回缓存；过期后携带 If-None-Match / If-Modified-Since 重新验证，
+    304 时沿用缓存内容。每个 URL 存为 <key>.json（元数据）+ <key>.body（正文）
+    """
+    def __init__(self, dir="cache/http", ttl=600, max_mb=50):
+        self.dir = dir
+        self.ttl = float(ttl)
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "error": 0}
+        self._lock = threading.Lock()
+        os.makedirs(dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.dir, key)
+        return base + ".json", base + ".body"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _store(self, url, meta, body=None):
+        meta_path, body_path = self._paths(url)
+        if body is not None:
+            _atomic_write(body_path, body)
+        _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _count(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+
+    def get(self, url):
+        """返回 (content: bytes, encoding: str)；请求失败且无缓存时抛出异常"""
+        meta, body = self._load(url)
+        now = time.time()
+        if meta is not None and now - meta["fetched_at"] < meta["max_age"]:
+            self._count("hit")
+            os.utime(self._paths(url)[0])
+            return body, meta.get("encoding")
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            resp = get(url, headers=headers)
+            if resp.status_code == 304 and meta is not None:
+                meta["fetched_at"] = now
+                meta["max_age"] = _max_age(resp.headers, meta["max_age"])
+                self._store(url, meta)
+                self._count("revalidated")
+                return body, meta.get("encoding")
+            resp.raise_for_status()
+        except Exception:
+            # 网络失败时退回旧缓存（若有）
+            self._count("error")
+            if meta is not None:
+                return body, meta.get("encoding")
+            raise
+
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag", ""),
+            "last_modified": resp.headers.get("Last-Modified", ""),
+            "encoding": resp.encoding or resp.apparent_encoding,
+            "fetched_at": now,
+            "max_age": _max_age(resp.headers, self.ttl),
+        }
+        if "no-store" not in resp.headers.get("Cache-Control", ""):
+            self._store(url, meta, resp.content)
+            self.evict()
+        self._count("miss")
+        return resp.content, meta["encoding"]
+
+    def evict(self):
+        """总大小超过上限时，按最近访问时间从旧到新删除条目"""
+        with self._lock:
+            entries, total = [], 0
+            for name in os.listdir(self.dir):
+                if not name.endswith(".json"):
+                    continue
+                meta_path = os.path.join(self.dir, name)
+                body_path = meta_path[:-5] + ".body"
+                try:
+                    size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                    atime = os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+                entries.append((atime, size, meta_path, body_path))
+                total += size
+            entries.sort()
+            while total > self.max_bytes and entries:
+                _, size, meta_path, body_path = entries.pop(0)
+                for p in (meta_path, body_path):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+                total -= size
+
+    def summary(self):
+        s = self.stats
+        return "hit=%d revalidated=%d miss=%d error=%d" % (s["hit"], s["revalidated"], s["miss"], s["error"])
+
+def _max_age(headers, default):
+    cc = headers.get("Cache-Control", "")
+    if "no-cache" in cc or "no-store" in cc:
+        return 0
+    m = re.search(r"max-age=(\d+)", cc)
+    return int(m.group(1)) if m else default
+
+def _atomic_write(path, data):
+    tmp = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = HTTPCache(**dict(CACHE_DEFAULTS, **(_opts.get("cache") or {})))
+        return _cache
+
+def cached_get(url):
+    """经磁盘缓存获取 URL 内容（bytes），用于 RSS 与列表页"""
+    return get_cache().get(url)[0]
+
+def cached_get_text(url):
+    content, encoding = get_cache().get(url)
+    return content.decode(encoding or "utf-8", errors="replace")
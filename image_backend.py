@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线图片生成接口的并发客户端
+asyncio 调度、requests 在线程中执行阻塞请求：限制同时进行的请求数，
+429/5xx 与连接错误按带抖动的指数退避重试（优先遵循 Retry-After），
+每条请求有总时限，结果按完成顺序返回，慢请求不再拖住整批
+"""
+import os, time, base64, random, asyncio
+import requests
+from requests.adapters import HTTPAdapter
+
+# 在线接口默认值，可在 config.yaml 的 image_backend 段覆盖
+BACKEND_DEFAULTS = {
+    "concurrency": 4,     # 同时进行的请求数
+    "retries": 3,         # 429/5xx/连接错误的重试次数
+    "backoff": 0.5,       # 退避基数（秒），第 n 次重试在 [0, backoff * 2^n] 内随机
+    "max_backoff": 8.0,
+    "timeout": 60,        # 单次 HTTP 请求超时（秒）
+    "deadline": 120,      # 单条提示词（含全部重试）的总时限（秒）
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+STABILITY_URL = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"
+
+class ImageResult:
+    __slots__ = ("key", "output_path", "ok", "status", "attempts", "elapsed", "error")
+
+    def __init__(self, key, output_path, ok=False, status=0, attempts=0, elapsed=0.0, error=""):
+        self.key, self.output_path, self.ok = key, output_path, ok
+        self.status, self.attempts, self.elapsed, self.error = status, attempts, elapsed, error
+
+    def __repr__(self):
+        return "ImageResult(%r, ok=%s, status=%d, attempts=%d, elapsed=%.2f, error=%r)" % (
+            self.key, self.ok, self.status, self.attempts, self.elapsed, self.error)
+
+class StabilityBackend:
+    """Stability AI text-to-image；STABILITY_API_URL 可指向本地桩服务"""
+    def __init__(self, api_key=None, url=None, width=1080, height=1920):
+        self.api_key = api_key or os.getenv("STABILITY_API_KEY", "")
+        self.url = url or os.getenv("STABILITY_API_URL", STABILITY_URL)
+        self.width, self.height = width, height
+
+    def enabled(self):
+        return bool(self.api_key)
+
+    def request(self, prompt):
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        data = {
+            "text_prompts": [{"text": prompt, "weight": 1}],
+            "cfg_scale": 7,
+            "height": self.height,
+            "width": self.width,
+            "samples": 1,
+            "steps": 30,
+        }
+        return self.url, headers, data
+
+    def parse(self, resp):
+        """返回图片字节；响应里没有图片时返回 None"""
+        artifacts = resp.json().get("artifacts") or []
+        return base64.b64decode(artifacts[0]["base64"]) if artifacts else None
+
+def retry_delay(attempt, resp, backoff, max_backoff):
+    """Retry-After 优先，否则 full jitter 指数退避"""
+    if resp is not None:
+        try:
+            return min(max_backoff, float(resp.headers.get("Retry-After", "")))
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_backoff, backoff * (2 ** attempt)))
+
+class RemoteImageClient:
+    def __init__(self, backend=None, concurrency=4, retries=3, backoff=0.5, max_backoff=8.0, timeout=60, deadline=120):
+        self.backend = backend or StabilityBackend()
+        self.concurrency = max(1, int(concurrency))
+        self.retries = int(retries)
+        self.backoff, self.max_backoff = float(backoff), float(max_backoff)
+        self.timeout, self.deadline = float(timeout), float(deadline)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, prompt, timeout):
+        url, headers, data = self.backend.request(prompt)
+        return self.session.post(url, headers=headers, json=data, timeout=timeout)
+
+    async def generate(self, key, prompt, output_path, sem):
+        res = ImageResult(key, output_path)
+        t0 = time.monotonic()
+        end = t0 + self.deadline
+        try:
+            for attempt in range(self.retries + 1):
+                left = end - time.monotonic()
+                if left <= 0:
+                    res.error = "deadline"
+                    break
+                resp, retry = None, False
+                async with sem:
+                    res.attempts += 1
+                    try:
+                        # 线程中的请求无法中途取消，超时取单次超时与剩余时限中较小者
+                        resp = await asyncio.wait_for(
+                            asyncio.to_thread(self._post, prompt, min(self.timeout, left)), left)
+                        res.status = resp.status_code
+                    except asyncio.TimeoutError:
+                        res.error = "deadline"
+                        break
+                    except requests.RequestException as e:
+                        res.error, retry = type(e).__name__, True
+                if resp is not None:
+                    if resp.status_code == 200:
+                        data = await asyncio.to_thread(self.backend.parse, resp)
+                        if data:
+                            with open(output_path, "wb") as f:
+                                f.write(data)
+                            res.ok, res.error = True, ""
+                        else:
+                            res.error = "empty"
+                        break
+                    res.error = "HTTP%d" % resp.status_code
+                    retry = resp.status_code in RETRY_STATUS
+                if not retry or attempt == self.retries:
+                    break
+                delay = retry_delay(attempt, resp, self.backoff, self.max_backoff)
+                if time.monotonic() + delay >= end:
+                    res.error = "deadline"
+                    break
+                await asyncio.sleep(delay)
+        except Exception as e:
+            res.error = "%s: %s" % (type(e).__name__, e)
+        res.elapsed = time.monotonic() - t0
+        return res
+
+    async def iter_results(self, jobs):
+        """jobs: [(key, 提示词, 输出路径)]；按完成顺序产出 ImageResult"""
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self.generate(k, p, o, sem)) for k, p, o in jobs]
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+
+    def run(self, jobs, on_result=None):
+        """同步入口：每完成一条即回调 on_result，返回全部结果（按完成顺序）"""
+        async def _run():
+            out = []
+            async for res in self.iter_results(jobs):
+                if on_result:
+                    on_result(res)
+                out.append(res)
+            return out
+        return asyncio.run(_run())
+
+def open_client(cfg=None, backend=None):
+    opts = dict(BACKEND_DEFAULTS, **((cfg or {}).get("image_backend") or {}))
+    return RemoteImageClient(backend, **opts)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻关键词词典与多模式匹配
+公司 / 产品 / 主题 / 提示词词典合并去重后编译一次：每个词在 C 层做子串查找，
+英文词再用预编译的边界正则确认，一次调用打出全部标签（含相互重叠的词）。
+与旧的逐组子串判断相比，英文词改为按单词边界匹配
+（"meta" 不再命中 "metadata"、"mit" 不再命中 "submit"，"gpt" 也不再命中 "chatgpt"，
+需要时用 aliases 显式声明，如 gpt 的别名 chatgpt），中文词仍按子串匹配
+"""
+import re, json, hashlib, threading
+
+# 词典默认值，可在 config.yaml 的 lexicon 段覆盖或扩充
+# companies / products / prompts 按 key 合并，themes 按顺序判定（先命中者优先），给出时整体替换
+LEXICON_DEFAULTS = {
+    "companies": {
+        "openai": {"name": "OpenAI", "color": "green", "icon": "brain"},
+        "anthropic": {"name": "Anthropic", "color": "orange", "icon": "chat"},
+        "microsoft": {"name": "Microsoft", "color": "blue", "icon": "windows"},
+        "google": {"name": "Google", "color": "multicolor", "icon": "search"},
+        "apple": {"name": "Apple", "color": "gray", "icon": "apple"},
+        "meta": {"name": "Meta", "color": "blue", "icon": "vr"},
+        "nvidia": {"name": "NVIDIA", "color": "green", "icon": "chip"},
+        "tesla": {"name": "Tesla", "color": "red", "icon": "car"},
+        "mit": {"name": "MIT", "color": "red", "icon": "university"},
+    },
+    "products": {
+        "gpt": {"name": "GPT", "type": "AI模型", "visual": "neural_network", "aliases": ["chatgpt"]},
+        "claude": {"name": "Claude", "type": "AI助手", "visual": "assistant_bot"},
+        "chatgpt": {"name": "ChatGPT", "type": "对话AI", "visual": "chat_interface"},
+        "dalle": {"name": "DALL-E", "type": "图像生成", "visual": "image_creation", "aliases": ["dall-e"]},
+        "机器人": {"name": "Robot", "type": "机器人", "visual": "robot_arm"},
+        "自动驾驶": {"name": "Autonomous", "type": "自动驾驶", "visual": "car_sensors"},
+        "芯片": {"name": "Chip", "type": "芯片", "visual": "circuit_board"},
+        "算法": {"name": "Algorithm", "type": "算法", "visual": "flowchart"},
+    },
+    "themes": [
+        {"theme": "product_launch", "style": "announcement", "words": ["发布", "推出", "宣布"]},
+        {"theme": "innovation", "style": "research", "words": ["突破", "创新", "研发"]},
+        {"theme": "business", "style": "corporate", "words": ["合作", "收购", "投资"]},
+        {"theme": "security", "style": "serious", "words": ["安全", "隐私", "监管"]},
+    ],
+    "prompts": {
+        "OpenAI": "OpenAI artificial intelligence",
+        "GPT": "GPT language model technology",
+        "Anthropic": "Anthropic AI company",
+        "Claude": "Claude AI assistant",
+        "机器人": "advanced robotics technology",
+        "人工智能": "artificial intelligence AI",
+        "MIT": "MIT university research laboratory",
+        "导航": "navigation autonomous system",
+        "算法": "algorithm computer science",
+        "深度学习": "deep learning neural network",
+        "数据": "data analytics technology",
+        "科技": "technology innovation",
+        "研发": "research development laboratory",
+        "突破": "breakthrough innovation",
+        "发布": "product launch announcement",
+    },
+}
+
+class KeywordMatcher:
+    """
+    编译后的多模式匹配器；patterns 为 [(词, 附带数据)]，匹配不区分大小写。
+    各组词典合并去重后，每个词用 str 的 C 层子串查找判断是否出现；
+    英文词出现时再用预编译的边界正则确认至少有一处满足单词边界。
+    命中结果与逐位置扫描（含相互重叠的词）一致
+    """
+    def __init__(self, patterns):
+        self.payloads = {}
+        for word, payload in patterns:
+            word = word.lower()
+            if word:
+                self.payloads.setdefault(word, []).append(payload)
+        # 英文词左侧不能紧跟字母数字，右侧不能紧跟字母（允许 gpt4、dalle3 这类版本号）；
+        # 正则以词本身开头，re 可先按字面量快速定位，再在词尾用定宽断言检查两侧
+        self.terms = [(w, re.compile(r"%s(?<![a-z0-9][\s\S]{%d})(?![a-z])" % (re.escape(w), len(w))).search
+                       if w.isascii() else None) for w in self.payloads]
+
+    def find(self, text):
+        """返回文本中命中的词（小写）列表"""
+        text = text.lower()
+        return [w for w, bounded in self.terms if w in text and (bounded is None or bounded(text))]
+
+class Lexicon:
+    """编译后的词典；tag() 返回各组命中的 key（保持词典中的顺序）"""
+    def __init__(self, companies, products, themes, prompts):
+        self.companies, self.products, self.prompts, self.themes = {}, {}, dict(prompts), list(themes)
+        patterns = []
+        for group, entries, target in (("companies", companies, self.companies), ("products", products, self.products)):
+            for key, info in entries.items():
+                info = dict(info)
+                aliases = info.pop("aliases", [])
+                target[key] = info
+                patterns += [(w, (group, key)) for w in [key] + list(aliases)]
+        patterns += [(key, ("prompts", key)) for key in self.prompts]
+        for idx, rule in enumerate(self.themes):
+            patterns += [(w, ("themes", idx)) for w in rule["words"]]
+        self.matcher = KeywordMatcher(patterns)
+        # (组, key) 在词典中的次序，tag() 只对命中的条目排序
+        self.order = {}
+        for group, keys in (("companies", self.companies), ("products", self.products),
+                            ("prompts", self.prompts), ("themes", range(len(self.themes)))):
+            for key in keys:
+                self.order[(group, key)] = len(self.order)
+        self.fingerprint = hashlib.sha1(json.dumps(
+            [companies, products, themes, prompts], ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def tag(self, text):
+        payloads = self.matcher.payloads
+        hits = set()
+        for word in self.matcher.find(text):
+            hits.update(payloads[word])
+        tags = {"companies": [], "products": [], "prompts": [], "themes": []}
+        for group, key in sorted(hits, key=self.order.__getitem__):
+            tags[group].append(key)
+        return tags
+
+    def tag_batch(self, texts):
+        return [self.tag(t) for t in texts]
+
+    def theme(self, tags):
+        """第一条命中的主题规则，没有则返回 None"""
+        return self.themes[tags["themes"][0]] if tags["themes"] else None
+
+def merge_lexicon(overrides=None):
+    lex = {k: (dict(v) if isinstance(v, dict) else list(v)) for k, v in LEXICON_DEFAULTS.items()}
+    for key, value in (overrides or {}).items():
+        if key not in lex or not value:
+            continue
+        if isinstance(lex[key], dict):
+            lex[key].update(value)
+        else:
+            lex[key] = list(value)
+    return lex
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def get_lexicon(config_path="config.yaml"):
+    """进程内单例：首次调用时读取 config.yaml 的 lexicon 段并编译，读取失败则用默认词典"""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            overrides = {}
+            try:
+                import yaml
+                with open(config_path, "r", encoding="utf-8") as f:
+                    overrides = (yaml.safe_load(f) or {}).get("lexicon") or {}
+            except Exception:
+                pass
+            _lexicon = Lexicon(**merge_lexicon(overrides))
+        return _lexicon
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻数据读写
+output/news/ 下既可能是整体写出的 <date>.json，也可能是逐条追加的 <date>.jsonl；
+下游脚本统一通过这里定位与读取，JSONL 在抓取过程中即可读取（忽略未写完的末行）；
+JSONL 只由抓取端追加，下游的改动写入旁边的覆盖层文件，读取时合并
+"""
+import os, re, json, glob, fcntl
+from contextlib import contextmanager
+
+NEWS_DIR = "output/news"
+NEWS_RE = re.compile(r"^\d{4}-\d{2}-\d{2}\.jsonl?$")
+
+def latest_news(news_dir=NEWS_DIR):
+    """最新日期的新闻文件；同一天 .json 与 .jsonl 并存时取较新的一个"""
+    files = [p for p in glob.glob(os.path.join(news_dir, "*.json*")) if NEWS_RE.match(os.path.basename(p))]
+    if not files:
+        return ""
+    return max(files, key=lambda p: (os.path.basename(p).split(".")[0], os.path.getmtime(p)))
+
+def overlay_path(path):
+    return path + ".overlay.json"
+
+@contextmanager
+def _overlay_lock(path):
+    # 多个下游脚本可能同时更新同一份 JSONL 的覆盖层，读改写期间加文件锁
+    with open(path + ".overlay.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _load_overlay(path):
+    try:
+        with open(overlay_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _load_lines(path):
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # 仍在写入的末行
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+    return items
+
+def load_items(path):
+    if path.endswith(".jsonl"):
+        # 下游脚本的改动（如 image_path）记在覆盖层里，按 url 合并到原始条目上
+        overlay = _load_overlay(path)
+        return [dict(it, **overlay.get(it.get("url", ""), {})) for it in _load_lines(path)]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_items(path, items):
+    """
+    .json 整体重写（原子替换）；.jsonl 可能仍由 JsonlWriter 追加写入，不能替换原文件，
+    改为把与原始条目不同的字段按 url 记入旁边的 <file>.overlay.json
+    """
+    if path.endswith(".jsonl"):
+        with _overlay_lock(path):
+            base = {it.get("url", ""): it for it in _load_lines(path)}
+            overlay = _load_overlay(path)
+            for it in items:
+                url = it.get("url", "")
+                if url not in base:
+                    continue
+                diff = {k: v for k, v in it.items() if base[url].get(k) != v}
+                overlay[url] = diff
+            _write_json(overlay_path(path), {u: d for u, d in overlay.items() if d})
+        return
+    _write_json(path, items, indent=2)
+
+def _write_json(path, data, indent=None):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+class JsonlWriter:
+    """逐条追加写出，并在旁边的 <file>.ckpt 记录已完成的来源与链接，用于断点续跑"""
+    def __init__(self, path):
+        self.path = path
+        self.ckpt_path = path + ".ckpt"
+        self.items = load_items(path) if os.path.exists(path) else []
+        state = {}
+        if os.path.exists(self.ckpt_path):
+            with open(self.ckpt_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        self.done_sources = set(state.get("sources", []))
+        self.done_urls = set(state.get("urls", [])) | {it["url"] for it in self.items}
+        # 截掉可能残留的半行，保证后续追加的每一行都完整
+        if os.path.exists(path):
+            with open(path, "rb+") as f:
+                data = f.read()
+                keep = data.rfind(b"\n") + 1
+                if keep != len(data):
+                    f.truncate(keep)
+        elif os.path.exists(overlay_path(path)):
+            os.remove(overlay_path(path))  # 重新开始的文件不沿用旧覆盖层
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, item):
+        self._f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.items.append(item)
+        self.done_urls.add(item["url"])
+
+    def mark_url(self, url):
+        """记录已处理但未输出的链接（解析失败或被判为重复）"""
+        self.done_urls.add(url)
+
+    def mark_source(self, name):
+        self.done_sources.add(name)
+        self.save_checkpoint()
+
+    def save_checkpoint(self):
+        tmp = self.ckpt_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sources": sorted(self.done_sources), "urls": sorted(self.done_urls)}, f, ensure_ascii=False)
+        os.replace(tmp, self.ckpt_path)
+
+    def close(self):
+        self.save_checkpoint()
+        self._f.close()
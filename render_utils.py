@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片渲染公共工具
+向量化渐变、分块图层合成、字体注册表与按像素宽度换行，
+供 smart_image_generator / generate_images_advanced / generate_video 共用
+"""
+import re, functools
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+def mix_colors(colors, ratio):
+    """按 ratio 在两种颜色间插值，逐像素结果与 int(c0*(1-r) + c1*r) 一致"""
+    out = np.empty(ratio.shape + (3,), dtype=np.uint8)
+    inv = 1 - ratio
+    for i in range(3):
+        out[..., i] = (colors[0][i] * inv + colors[1][i] * ratio).astype(np.uint8)
+    return out
+
+def radial_ratio(width, height, center, max_distance, scale=1.0):
+    """min(距离 / max_distance * scale, 1.0)，与逐像素循环的浮点运算顺序一致"""
+    ys = np.arange(height, dtype=np.int64)[:, None]
+    xs = np.arange(width, dtype=np.int64)[None, :]
+    d2 = ((xs - center[0]) ** 2 + (ys - center[1]) ** 2).astype(np.float64)
+    return np.minimum(d2 ** 0.5 / max_distance * scale, 1.0)
+
+def radial_gradient(width, height, colors, center, max_distance, scale=1.0):
+    return Image.fromarray(mix_colors(colors, radial_ratio(width, height, center, max_distance, scale)))
+
+def shape_points(xy):
+    """ImageDraw 坐标参数（[x0, y0, x1, y1] 或 [(x, y), ...]）统一为点列表"""
+    flat = [v for p in xy for v in (p if isinstance(p, (tuple, list)) else (p,))]
+    return list(zip(flat[0::2], flat[1::2]))
+
+class ShapeGroup:
+    """ShapeLayer.group() 的绘制接口：只记录图形，由 ShapeLayer 统一绘制"""
+    def __init__(self):
+        self.shapes = []
+
+    def ellipse(self, xy, **kw):
+        self.shapes.append(("ellipse", shape_points(xy), kw))
+
+    def rectangle(self, xy, **kw):
+        self.shapes.append(("rectangle", shape_points(xy), kw))
+
+    def line(self, xy, **kw):
+        self.shapes.append(("line", shape_points(xy), kw))
+
+    def polygon(self, xy, **kw):
+        self.shapes.append(("polygon", shape_points(xy), kw))
+
+class ShapeLayer:
+    """
+    共享的半透明装饰图层
+    每个图形只在自身包围盒大小的小块上绘制，再以 alpha 合成叠到图层上
+    （“over” 运算满足结合律，效果等同于逐个叠加到底图），最后一次性与底图混合。
+    用法与 ImageDraw 相同：layer.ellipse(box, fill=...)、layer.line(points, fill=..., width=...)。
+    成组的图案用 with layer.group() as draw: 组内的图形先记录下来（组内后画的像素覆盖先画的，
+    相当于每组单独一张叠加层），结束时按全部图形坐标算出的包围盒分配子图层、平移后绘制，
+    再以 alpha 合成叠到图层上，与其他组正常混合
+    """
+    def __init__(self, size):
+        self.overlay = Image.new("RGBA", size, (255, 255, 255, 0))
+
+    def _box(self, pts, kw):
+        """图形的包围盒（按线宽外扩，裁剪到图层内）"""
+        pad = int(kw.get("width", 1)) + 1
+        return (max(0, int(min(p[0] for p in pts)) - pad),
+                max(0, int(min(p[1] for p in pts)) - pad),
+                min(self.overlay.width, int(max(p[0] for p in pts)) + pad + 1),
+                min(self.overlay.height, int(max(p[1] for p in pts)) + pad + 1))
+
+    def _paint(self, shapes, box):
+        """在包围盒大小的小块上依次绘制 [(类型, 坐标点, 参数)]，再合成到图层上"""
+        x0, y0, x1, y1 = box
+        if x1 <= x0 or y1 <= y0:
+            return
+        tile = Image.new("RGBA", (x1 - x0, y1 - y0), (255, 255, 255, 0))
+        draw = ImageDraw.Draw(tile)
+        for kind, pts, kw in shapes:
+            getattr(draw, kind)([(x - x0, y - y0) for x, y in pts], **kw)
+        self.overlay.alpha_composite(tile, dest=(x0, y0))
+
+    @contextmanager
+    def group(self):
+        rec = ShapeGroup()
+        yield rec
+        if rec.shapes:
+            boxes = [self._box(pts, kw) for _, pts, kw in rec.shapes]
+            self._paint(rec.shapes, (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                                     max(b[2] for b in boxes), max(b[3] for b in boxes)))
+
+    def _draw(self, kind, xy, **kw):
+        pts = shape_points(xy)
+        self._paint([(kind, pts, kw)], self._box(pts, kw))
+
+    def ellipse(self, xy, **kw):
+        self._draw("ellipse", xy, **kw)
+
+    def rectangle(self, xy, **kw):
+        self._draw("rectangle", xy, **kw)
+
+    def line(self, xy, **kw):
+        self._draw("line", xy, **kw)
+
+    def polygon(self, xy, **kw):
+        self._draw("polygon", xy, **kw)
+
+    def flatten(self, img):
+        """与底图混合一次，返回 RGB 图像"""
+        return Image.alpha_composite(img.convert("RGBA"), self.overlay).convert("RGB")
+
+@functools.lru_cache(maxsize=64)
+def get_font(path, size):
+    """进程级字体注册表：同一 (字体文件, 字号) 只解析一次；加载失败时退回默认字体"""
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+# 换行切分单位：连续的拉丁单词/数字（连同其后空白）为一段，其余字符（中日韩文字、标点）逐字成段
+RUN_RE = re.compile(r"[A-Za-z0-9_\-.'’@#%&/:+]+\s*|\s+|.")
+# 不能出现在行首的标点，换行时留在上一行末尾
+NO_LINE_START = set("，。！？、；：）》」』】,.!?;:)]}%…")
+_run_widths = {}
+
+def _font_key(font):
+    return (getattr(font, "path", None), getattr(font, "size", None), id(font) if not hasattr(font, "path") else 0)
+
+def text_width(font, run):
+    """按像素测量一段文字宽度（getlength），结果按 (字体, 文字段) 记忆"""
+    key = (_font_key(font), run)
+    w = _run_widths.get(key)
+    if w is None:
+        w = font.getlength(run)
+        if len(_run_widths) > 50000:
+            _run_widths.clear()
+        _run_widths[key] = w
+    return w
+
+def wrap_text(text, font, max_width, max_lines=None, ellipsis="…"):
+    """
+    按实际像素宽度换行：英文在单词边界断行，中文可在任意字间断行，
+    避免标点出现在行首；超过 max_lines 时截断并在末行加省略号
+    """
+    lines, cur, cur_w = [], "", 0.0
+    for line_text in text.replace("\r", "").split("\n"):
+        for run in RUN_RE.findall(line_text):
+            w = text_width(font, run)
+            if cur and cur_w + text_width(font, run.rstrip()) > max_width and run not in NO_LINE_START:
+                lines.append(cur.rstrip())
+                cur, cur_w = "", 0.0
+                run = run.lstrip()
+                if not run:
+                    continue
+                w = text_width(font, run)
+            if w > max_width and not cur:
+                # 单个超长片段（如长链接）按字符硬切
+                for ch in run:
+                    cw = text_width(font, ch)
+                    if cur and cur_w + cw > max_width:
+                        lines.append(cur)
+                        cur, cur_w = "", 0.0
+                    cur += ch
+                    cur_w += cw
+                continue
+            cur += run
+            cur_w += w
+        if cur.strip():
+            lines.append(cur.rstrip())
+        cur, cur_w = "", 0.0
+    lines = [l for l in lines if l]
+    if max_lines is not None and len(lines) > max_lines:
+        lines = lines[:max_lines]
+        last = lines[-1]
+        while last and text_width(font, last + ellipsis) > max_width:
+            last = last[:-1]
+        lines[-1] = last.rstrip() + ellipsis
+    return lines
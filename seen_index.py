@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已处理文章索引（SQLite）
+按规范化 URL 与正文哈希记录已解析过的文章及其标题、摘要、配图，
+重复运行时直接复用，只需重新抓取 RSS / 列表页
+"""
+import os, time, sqlite3, hashlib, threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 索引默认值，可在 config.yaml 的 index 段覆盖
+INDEX_DEFAULTS = {
+    "path": "cache/seen.sqlite3",
+    "max_age_days": 30,   # 超过该天数未再出现的条目会被清理
+    "max_rows": 5000,     # 条目上限，超出时删除最久未出现的条目
+}
+
+# 规范化时去掉的跟踪参数
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "mc_cid", "mc_eid"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url          TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    summary      TEXT NOT NULL,
+    image_url    TEXT NOT NULL DEFAULT '',
+    image_path   TEXT NOT NULL DEFAULT '',
+    signature    TEXT NOT NULL DEFAULT '',
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_hash ON articles(content_hash);
+CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles(last_seen);
+"""
+
+def normalize_url(url):
+    """小写 scheme/host，去掉片段、跟踪参数与末尾斜杠，参数排序"""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not (k.lower().startswith(TRACKING_PREFIXES) or k.lower() in TRACKING_PARAMS)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path,
+                       urlencode(sorted(query)), ""))
+
+def content_hash(title, body):
+    text = " ".join((title + "\n" + body).split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class SeenIndex:
+    def __init__(self, path="cache/seen.sqlite3", max_age_days=30, max_rows=5000):
+        self.max_age = float(max_age_days) * 86400
+        self.max_rows = int(max_rows)
+        self.stats = {"url_hit": 0, "hash_hit": 0, "stored": 0}
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        cols = {r["name"] for r in self._db.execute("PRAGMA table_info(articles)")}
+        if "signature" not in cols:  # 旧版索引升级
+            self._db.execute("ALTER TABLE articles ADD COLUMN signature TEXT NOT NULL DEFAULT ''")
+            self._db.commit()
+
+    def _touch(self, row, kind):
+        self._db.execute("UPDATE articles SET last_seen=? WHERE url=?", (time.time(), row["url"]))
+        self._db.commit()
+        self.stats[kind] += 1
+        return dict(row)
+
+    def lookup(self, url):
+        """按规范化 URL 查找，命中时返回记录字典"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM articles WHERE url=?", (normalize_url(url),)).fetchone()
+            return self._touch(row, "url_hit") if row else None
+
+    def peek(self, url):
+        """按规范化 URL 读取记录，不更新 last_seen，也不计入命中统计（用于续跑时预热）"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM articles WHERE url=?", (normalize_url(url),)).fetchone()
+            return dict(row) if row else None
+
+    def lookup_hash(self, chash):
+        """按正文哈希查找（同一篇文章换了 URL）"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM articles WHERE content_hash=? ORDER BY last_seen DESC LIMIT 1",
+                                   (chash,)).fetchone()
+            return self._touch(row, "hash_hit") if row else None
+
+    def store(self, url, chash, title, summary, image_url="", image_path="", signature=()):
+        """signature 为 dedup 的 MinHash 签名，供后续运行做近重复比较"""
+        now = time.time()
+        sig = ",".join(str(x) for x in signature)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO articles (url, content_hash, title, summary, image_url, image_path, signature, "
+                "first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET content_hash=excluded.content_hash, title=excluded.title, "
+                "summary=excluded.summary, image_url=excluded.image_url, image_path=excluded.image_path, "
+                "signature=excluded.signature, last_seen=excluded.last_seen",
+                (normalize_url(url), chash, title, summary, image_url, image_path, sig, now, now))
+            self._db.commit()
+            self.stats["stored"] += 1
+
+    def prune(self):
+        """删除过期条目，并把总条目数限制在 max_rows 以内"""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM articles WHERE last_seen < ?", (time.time() - self.max_age,))
+            removed = cur.rowcount
+            cur = self._db.execute(
+                "DELETE FROM articles WHERE url IN (SELECT url FROM articles ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,))
+            removed += cur.rowcount
+            self._db.commit()
+            return removed
+
+    def summary(self):
+        s = self.stats
+        return "url_hit=%d hash_hit=%d stored=%d" % (s["url_hit"], s["hash_hit"], s["stored"])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def parse_signature(text):
+    return [int(x) for x in text.split(",")] if text else []
+
+def open_index(cfg=None):
+    opts = dict(INDEX_DEFAULTS, **((cfg or {}).get("index") or {}))
+    return SeenIndex(**opts)
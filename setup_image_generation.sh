@@ -18,6 +18,8 @@ if [[ $install_diffusion =~ ^[Yy]$ ]]; then
     echo "安装PyTorch和Diffusers..."
     pip install torch torchvision torchaudio
     pip install diffusers transformers accelerate
+    echo "下载小型离线模型 (nota-ai/bk-sdm-tiny，可在 config.yaml 的 diffusion.model 修改)..."
+    python3 -c "from diffusers import StableDiffusionPipeline; StableDiffusionPipeline.from_pretrained('nota-ai/bk-sdm-tiny')"
     echo "✅ 本地Stable Diffusion已安装"
 else
     echo "⏭️ 跳过本地Stable Diffusion安装"
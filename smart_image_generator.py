@@ -5,24 +5,44 @@
 根据新闻内容语义分析，生成贴合主题的专业图片
 支持多种MCP图片生成服务
 """
-import os, json, glob, datetime, hashlib
+import os, json, glob, datetime, hashlib, shutil, threading, argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 import random, requests, re
 from dateutil.tz import tzlocal
 import base64
 from io import BytesIO
+import numpy as np
+import news_io
+from render_utils import mix_colors, radial_gradient, ShapeLayer, get_font, wrap_text
+from keywords import get_lexicon
 
 # 配置
 W, H = 1080, 1920
 FONT_PATH = "/System/Library/Fonts/Hiragino Sans GB.ttc"
 
+# 背景模板缓存：同一组 (主题, 颜色方案, 图标元素, 公司) 的背景只渲染一次。
+# 修改背景/图案/文字底板的绘制逻辑时递增 TEMPLATE_VERSION，旧缓存即失效
+TEMPLATE_VERSION = 3
+PLATE_CACHE_DIR = "cache/plates"
+PLATE_MEMORY_ITEMS = 16   # 进程内 LRU 条目数
+PLATE_DISK_ITEMS = 128    # 磁盘缓存文件数上限
+
+# 文字层/整体版式变化时递增 RENDERER_VERSION；与 TEMPLATE_VERSION、关键词词典指纹一起计入图片内容哈希，
+# 内容与版本都未变的新闻直接复用已生成的图片
+RENDERER_VERSION = 1
+OUTPUT_DIR = "assets/smart_generated"
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+
 def latest(path):
     files = sorted(glob.glob(path), reverse=True)
     return files[0] if files else ""
 
 def analyze_news_content(title, summary):
     """分析新闻内容，提取关键信息用于图片生成"""
-    content = (title + " " + summary).lower()
+    lexicon = get_lexicon()
+    tags = lexicon.tag(title + " " + summary)
     
     analysis = {
         "主题": "technology",
@@ -35,54 +55,23 @@ def analyze_news_content(title, summary):
     }
     
     # 公司识别
-    companies = {
-        "openai": {"name": "OpenAI", "color": "green", "icon": "brain"},
-        "anthropic": {"name": "Anthropic", "color": "orange", "icon": "chat"},
-        "microsoft": {"name": "Microsoft", "color": "blue", "icon": "windows"},
-        "google": {"name": "Google", "color": "multicolor", "icon": "search"},
-        "apple": {"name": "Apple", "color": "gray", "icon": "apple"},
-        "meta": {"name": "Meta", "color": "blue", "icon": "vr"},
-        "nvidia": {"name": "NVIDIA", "color": "green", "icon": "chip"},
-        "tesla": {"name": "Tesla", "color": "red", "icon": "car"},
-        "mit": {"name": "MIT", "color": "red", "icon": "university"}
-    }
-    
-    for key, info in companies.items():
-        if key in content:
-            analysis["公司"].append(info)
-            analysis["颜色方案"] = info["color"]
-            analysis["图标元素"].append(info["icon"])
+    for key in tags["companies"]:
+        info = lexicon.companies[key]
+        analysis["公司"].append(info)
+        analysis["颜色方案"] = info["color"]
+        analysis["图标元素"].append(info["icon"])
     
     # 产品/技术识别
-    products = {
-        "gpt": {"name": "GPT", "type": "AI模型", "visual": "neural_network"},
-        "claude": {"name": "Claude", "type": "AI助手", "visual": "assistant_bot"},
-        "chatgpt": {"name": "ChatGPT", "type": "对话AI", "visual": "chat_interface"},
-        "dalle": {"name": "DALL-E", "type": "图像生成", "visual": "image_creation"},
-        "机器人": {"name": "Robot", "type": "机器人", "visual": "robot_arm"},
-        "自动驾驶": {"name": "Autonomous", "type": "自动驾驶", "visual": "car_sensors"},
-        "芯片": {"name": "Chip", "type": "芯片", "visual": "circuit_board"},
-        "算法": {"name": "Algorithm", "type": "算法", "visual": "flowchart"}
-    }
-    
-    for key, info in products.items():
-        if key in content:
-            analysis["产品"].append(info)
-            analysis["图标元素"].append(info["visual"])
+    for key in tags["products"]:
+        info = lexicon.products[key]
+        analysis["产品"].append(info)
+        analysis["图标元素"].append(info["visual"])
     
     # 主题分析
-    if any(word in content for word in ["发布", "推出", "宣布"]):
-        analysis["主题"] = "product_launch"
-        analysis["风格"] = "announcement"
-    elif any(word in content for word in ["突破", "创新", "研发"]):
-        analysis["主题"] = "innovation"
-        analysis["风格"] = "research"
-    elif any(word in content for word in ["合作", "收购", "投资"]):
-        analysis["主题"] = "business"
-        analysis["风格"] = "corporate"
-    elif any(word in content for word in ["安全", "隐私", "监管"]):
-        analysis["主题"] = "security"
-        analysis["风格"] = "serious"
+    rule = lexicon.theme(tags)
+    if rule:
+        analysis["主题"] = rule["theme"]
+        analysis["风格"] = rule["style"]
     
     return analysis
 
@@ -101,85 +90,64 @@ def get_theme_colors(analysis):
     return color_schemes.get(analysis["颜色方案"], color_schemes["blue"])
 
 def create_semantic_background(analysis, width=W, height=H):
-    """根据语义分析创建背景"""
+    """根据语义分析创建背景（NumPy 向量化，逐像素与原循环实现一致）"""
     colors = get_theme_colors(analysis)
-    
-    # 创建基础渐变
-    img = Image.new('RGB', (width, height), colors[0])
-    
+
     # 根据主题选择渐变样式
     if analysis["主题"] == "product_launch":
         # 产品发布：中心放射渐变
-        for y in range(height):
-            for x in range(width):
-                center_x, center_y = width//2, height//3
-                distance = ((x - center_x)**2 + (y - center_y)**2)**0.5
-                max_distance = width * 0.8
-                ratio = min(distance / max_distance, 1.0)
-                
-                r = int(colors[0][0] * (1 - ratio) + colors[1][0] * ratio)
-                g = int(colors[0][1] * (1 - ratio) + colors[1][1] * ratio)
-                b = int(colors[0][2] * (1 - ratio) + colors[1][2] * ratio)
-                
-                img.putpixel((x, y), (r, g, b))
-    
+        return radial_gradient(width, height, colors, (width//2, height//3), width * 0.8)
+
     elif analysis["主题"] == "innovation":
         # 创新研究：对角渐变
-        for y in range(height):
-            ratio = y / height * 0.8 + (height - y) / height * 0.2
-            for x in range(width):
-                x_ratio = x / width * 0.3
-                final_ratio = (ratio + x_ratio) / 1.3
-                
-                r = int(colors[0][0] * (1 - final_ratio) + colors[1][0] * final_ratio)
-                g = int(colors[0][1] * (1 - final_ratio) + colors[1][1] * final_ratio)
-                b = int(colors[0][2] * (1 - final_ratio) + colors[1][2] * final_ratio)
-                
-                img.putpixel((x, y), (r, g, b))
-    
+        ys = np.arange(height, dtype=np.float64)[:, None]
+        xs = np.arange(width, dtype=np.float64)[None, :]
+        ratio = ys / height * 0.8 + (height - ys) / height * 0.2
+        final_ratio = (ratio + xs / width * 0.3) / 1.3
+        return Image.fromarray(mix_colors(colors, final_ratio))
+
     else:
-        # 默认：垂直渐变
-        for y in range(height):
-            ratio = y / height
-            color = tuple(int(colors[0][i] * (1 - ratio) + colors[1][i] * ratio) for i in range(3))
-            for x in range(width):
-                img.putpixel((x, y), color)
-    
-    return img
+        # 默认：垂直渐变，逐行颜色相同
+        ratio = np.arange(height, dtype=np.float64)[:, None] / height
+        row = mix_colors(colors, ratio)
+        return Image.fromarray(np.ascontiguousarray(np.broadcast_to(row, (height, width, 3))))
 
 def add_semantic_elements(img, analysis):
-    """根据语义分析添加相关视觉元素"""
-    draw = ImageDraw.Draw(img)
+    """根据语义分析添加相关视觉元素：每组图案在各自子图层内绘制后叠到共享图层，最后只与底图合成一次"""
+    layer = ShapeLayer((W, H))
     
     # 为不同主题添加特定图案
     if "neural_network" in analysis["图标元素"]:
         # 添加神经网络图案
-        add_neural_network_pattern(img)
+        with layer.group() as draw:
+            add_neural_network_pattern(draw)
     
     if "robot_arm" in analysis["图标元素"]:
         # 添加机器人相关图案
-        add_robotics_pattern(img)
+        with layer.group() as draw:
+            add_robotics_pattern(draw)
     
     if "circuit_board" in analysis["图标元素"]:
         # 添加电路板图案
-        add_circuit_pattern(img)
+        with layer.group() as draw:
+            add_circuit_pattern(draw)
     
     # 添加公司特色元素
     for company in analysis["公司"]:
         if company["name"] == "OpenAI":
-            add_openai_elements(img)
+            with layer.group() as draw:
+                add_openai_elements(draw)
         elif company["name"] == "Anthropic":
-            add_anthropic_elements(img)
+            with layer.group() as draw:
+                add_anthropic_elements(draw)
         elif company["name"] == "MIT":
-            add_academic_elements(img)
+            with layer.group() as draw:
+                add_academic_elements(draw)
     
-    return img
+    return layer.flatten(img)
 
-def add_neural_network_pattern(img):
-    """添加神经网络图案"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_neural_network_pattern(draw):
+    """添加神经网络图案（绘制到成组的子图层）"""
     # 绘制节点和连接线
     nodes = []
     for layer in range(3):
@@ -195,15 +163,9 @@ def add_neural_network_pattern(img):
         for j in range(i+1, len(nodes)):
             if abs(nodes[i][0] - nodes[j][0]) < 250:  # 只连接相邻层
                 draw.line([nodes[i], nodes[j]], fill=(255, 255, 255, 30), width=2)
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def add_robotics_pattern(img):
-    """添加机器人图案"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_robotics_pattern(draw):
+    """添加机器人图案（绘制到成组的子图层）"""
     # 绘制机械臂风格的几何图形
     for i in range(3):
         x = 200 + i * 150
@@ -215,15 +177,9 @@ def add_robotics_pattern(img):
             next_x = 200 + (i+1) * 150
             next_y = 150 + (i+1) * 80
             draw.line([(x, y), (next_x, next_y)], fill=(255, 255, 255, 50), width=8)
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def add_circuit_pattern(img):
-    """添加电路板图案"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_circuit_pattern(draw):
+    """添加电路板图案（绘制到成组的子图层）"""
     # 绘制电路线条
     for i in range(0, W, 80):
         draw.line([(i, 0), (i, H//3)], fill=(255, 255, 255, 25), width=2)
@@ -232,15 +188,9 @@ def add_circuit_pattern(img):
             # 添加电路节点
             if i % 160 == 0 and j % 120 == 0:
                 draw.rectangle([i-5, j-5, i+5, j+5], fill=(255, 255, 255, 60))
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def add_openai_elements(img):
-    """添加OpenAI风格元素"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_openai_elements(draw):
+    """添加OpenAI风格元素（绘制到成组的子图层）"""
     # OpenAI的螺旋图案
     center_x, center_y = W//4, H//4
     for angle in range(0, 360, 5):
@@ -249,15 +199,9 @@ def add_openai_elements(img):
         x = center_x + radius * math.cos(math.radians(angle))
         y = center_y + radius * math.sin(math.radians(angle))
         draw.ellipse([x-3, y-3, x+3, y+3], fill=(255, 255, 255, 40))
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def add_anthropic_elements(img):
-    """添加Anthropic风格元素"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_anthropic_elements(draw):
+    """添加Anthropic风格元素（绘制到成组的子图层）"""
     # 对话气泡风格的图案
     for i in range(3):
         x = W//2 + i * 80
@@ -268,15 +212,9 @@ def add_anthropic_elements(img):
         for j in range(3):
             dot_x = x - 15 + j * 15
             draw.ellipse([dot_x-3, y-3, dot_x+3, y+3], fill=(255, 255, 255, 80))
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def add_academic_elements(img):
-    """添加学术研究风格元素"""
-    overlay = Image.new('RGBA', (W, H), (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
+def add_academic_elements(draw):
+    """添加学术研究风格元素（绘制到成组的子图层）"""
     # 网格和图表风格
     for i in range(5):
         y = 100 + i * 80
@@ -287,28 +225,15 @@ def add_academic_elements(img):
             x = 100 + j * 120
             height = random.randint(10, 60)
             draw.rectangle([x-10, y-height, x+10, y], fill=(255, 255, 255, 50))
-    
-    img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-    return img
 
-def create_smart_news_image(title, summary, source, output_path):
-    """创建智能新闻图片"""
-    print(f"  🧠 分析新闻语义: {title[:30]}...")
-    
-    # 语义分析
-    analysis = analyze_news_content(title, summary)
-    print(f"  📊 主题: {analysis['主题']}, 公司: {[c['name'] for c in analysis['公司']]}")
-    print(f"  🎨 颜色方案: {analysis['颜色方案']}, 图标: {analysis['图标元素']}")
-    
+def render_background_plate(analysis):
+    """渲染背景模板：语义背景、语义元素与文字区域底板，不含任何文字"""
     # 创建语义背景
     img = create_semantic_background(analysis)
     
     # 添加语义元素
     img = add_semantic_elements(img, analysis)
     
-    # 添加文字层
-    img = img.convert('RGBA')
-    
     # 文字背景
     overlay = Image.new('RGBA', (W, H), (0, 0, 0, 0))
     draw = ImageDraw.Draw(overlay)
@@ -319,20 +244,100 @@ def create_smart_news_image(title, summary, source, output_path):
     # 底部文字区域  
     draw.rectangle([(0, H*2//3), (W, H)], fill=(0, 0, 0, 150))
     
-    img = Image.alpha_composite(img, overlay)
+    return Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
+
+def plate_key(analysis):
+    """背景模板只取决于这些字段；版本号与尺寸一并计入"""
+    parts = [
+        "v%d" % TEMPLATE_VERSION, "%dx%d" % (W, H),
+        analysis["主题"], analysis["颜色方案"],
+        ",".join(analysis["图标元素"]),
+        ",".join(c["name"] for c in analysis["公司"]),
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+class PlateCache:
+    """背景模板两级缓存：进程内 LRU + 磁盘 PNG（按版本分目录，版本变化时清除旧目录）"""
+    def __init__(self, cache_dir=PLATE_CACHE_DIR, memory_items=PLATE_MEMORY_ITEMS, disk_items=PLATE_DISK_ITEMS):
+        self.dir = os.path.join(cache_dir, "v%d" % TEMPLATE_VERSION)
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.stats = {"memory": 0, "disk": 0, "render": 0}
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name != "v%d" % TEMPLATE_VERSION:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+    def get(self, analysis):
+        key = plate_key(analysis)
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.stats["memory"] += 1
+                return self._mem[key].copy()
+        path = os.path.join(self.dir, key + ".png")
+        if os.path.exists(path):
+            plate = Image.open(path).convert("RGB")
+            os.utime(path)
+            self.stats["disk"] += 1
+        else:
+            # 模板中的随机装饰以模板 key 为种子，多进程谁先渲染结果都一样
+            random.seed(key)
+            plate = render_background_plate(analysis)
+            tmp = "%s.%d.tmp" % (path, os.getpid())
+            plate.save(tmp, "PNG")
+            os.replace(tmp, path)
+            self.stats["render"] += 1
+            self._evict_disk()
+        with self._lock:
+            self._mem[key] = plate
+            while len(self._mem) > self.memory_items:
+                self._mem.popitem(last=False)
+        return plate.copy()
+
+    def _evict_disk(self):
+        files = [os.path.join(self.dir, f) for f in os.listdir(self.dir) if f.endswith(".png")]
+        if len(files) <= self.disk_items:
+            return
+        files.sort(key=os.path.getmtime)
+        for f in files[:len(files) - self.disk_items]:
+            try:
+                os.remove(f)
+            except OSError:
+                pass
+
+    def summary(self):
+        return "memory=%d disk=%d render=%d" % (self.stats["memory"], self.stats["disk"], self.stats["render"])
+
+_plates = None
+
+def get_background_plate(analysis):
+    global _plates
+    if _plates is None:
+        _plates = PlateCache()
+    return _plates.get(analysis)
+
+def create_smart_news_image(title, summary, source, output_path):
+    """创建智能新闻图片"""
+    print(f"  🧠 分析新闻语义: {title[:30]}...")
+    
+    # 语义分析
+    analysis = analyze_news_content(title, summary)
+    print(f"  📊 主题: {analysis['主题']}, 公司: {[c['name'] for c in analysis['公司']]}")
+    print(f"  🎨 颜色方案: {analysis['颜色方案']}, 图标: {analysis['图标元素']}")
+    
+    # 背景模板（语义背景 + 语义元素 + 文字底板），相同组合直接复用缓存
+    img = get_background_plate(analysis).convert('RGBA')
     
     # 添加文字
     draw = ImageDraw.Draw(img)
     
-    # 加载字体
-    try:
-        font_large = ImageFont.truetype(FONT_PATH, 68)
-        font_medium = ImageFont.truetype(FONT_PATH, 44)
-        font_small = ImageFont.truetype(FONT_PATH, 34)
-    except:
-        font_large = ImageFont.load_default()
-        font_medium = ImageFont.load_default()
-        font_small = ImageFont.load_default()
+    # 加载字体（进程级缓存，字体文件只解析一次）
+    font_large = get_font(FONT_PATH, 68)
+    font_medium = get_font(FONT_PATH, 44)
+    font_small = get_font(FONT_PATH, 34)
     
     # 品牌和来源
     draw.text((60, 60), "AI科技速递", font=font_medium, fill=(255, 255, 255), stroke_width=2, stroke_fill=(0,0,0))
@@ -344,23 +349,10 @@ def create_smart_news_image(title, summary, source, output_path):
     
     draw.text((60, 160), f"📰 {source}", font=font_small, fill=(180, 180, 180))
     
-    # 主标题智能换行
+    # 主标题按像素宽度换行
     y_pos = H*2//3 + 60
-    title_lines = []
-    
-    if len(title) > 18:
-        # 寻找最佳断点
-        break_chars = "，。！？、发布宣布推出"
-        best_break = len(title) // 2
-        
-        for i in range(len(title)//2 - 6, len(title)//2 + 6):
-            if i < len(title) and title[i] in break_chars:
-                best_break = i + 1
-                break
-        
-        title_lines = [title[:best_break].strip(), title[best_break:].strip()]
-    else:
-        title_lines = [title]
+    text_width = W - 120
+    title_lines = wrap_text(title, font_large, text_width, max_lines=3)
     
     # 绘制标题
     for i, line in enumerate(title_lines):
@@ -368,23 +360,12 @@ def create_smart_news_image(title, summary, source, output_path):
             draw.text((60, y_pos + i * 90), line, font=font_large, fill=(255, 255, 255), 
                      stroke_width=2, stroke_fill=(0,0,0))
     
-    # 摘要
+    # 摘要：填满主题标签上方的剩余空间
     y_pos += len(title_lines) * 90 + 40
-    summary_lines = []
-    if len(summary) > 40:
-        mid = len(summary) // 2
-        for i in range(mid-10, mid+10):
-            if i < len(summary) and summary[i] in "。！？，":
-                summary_lines = [summary[:i+1], summary[i+1:]]
-                break
-        else:
-            summary_lines = [summary[:40] + "...", summary[40:80] + "..."]
-    else:
-        summary_lines = [summary]
+    summary_lines = wrap_text(summary, font_medium, text_width, max_lines=max(1, (H - 140 - y_pos) // 50))
     
-    for i, line in enumerate(summary_lines[:2]):
-        if line.strip():
-            draw.text((60, y_pos + i * 50), line.strip(), font=font_medium, fill=(220, 220, 220))
+    for i, line in enumerate(summary_lines):
+        draw.text((60, y_pos + i * 50), line, font=font_medium, fill=(220, 220, 220))
     
     # 主题标签
     if analysis["主题"]:
@@ -402,27 +383,66 @@ def create_smart_news_image(title, summary, source, output_path):
     final_img.save(output_path, quality=95, optimize=True)
     return True
 
+def item_seed(title):
+    """每条新闻的随机种子，保证装饰元素可复现"""
+    return int(hashlib.md5(title.encode()).hexdigest()[:8], 16)
+
+def render_item(job):
+    """渲染单条新闻图片（可在子进程中运行），返回 (序号, 输出路径；失败为空串)"""
+    i, title, summary, source, output_path = job
+    random.seed(item_seed(title))
+    try:
+        ok = create_smart_news_image(title, summary, source, output_path)
+    except Exception as e:
+        print(f"  ❌ 生成失败: {title[:30]} ({e})")
+        ok = False
+    return i, output_path if ok else ""
+
+def image_hash(title, summary, source):
+    parts = ["r%d" % RENDERER_VERSION, "t%d" % TEMPLATE_VERSION, "%dx%d" % (W, H),
+             "l" + get_lexicon().fingerprint, title, summary, source]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"images": {}}
+
+def save_manifest(manifest):
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
 def main():
     """主函数"""
+    ap = argparse.ArgumentParser(description="智能新闻图片生成器")
+    ap.add_argument("--workers", type=int, default=1, help="并行渲染的进程数（默认 1，串行）")
+    ap.add_argument("--force", action="store_true", help="忽略已生成的图片，全部重新渲染")
+    args = ap.parse_args()
+
     print("🚀 启动智能新闻图片生成器...")
     
-    news_json = latest("output/news/*.json")
+    news_json = news_io.latest_news()
     if not news_json:
         print("❌ 未找到新闻数据")
         return
     
-    with open(news_json, "r", encoding="utf-8") as f:
-        items = json.load(f)
+    items = news_io.load_items(news_json)
     
     if not items:
         print("❌ 新闻数据为空")
         return
     
-    os.makedirs("assets/smart_generated", exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = load_manifest()
+    known = manifest.get("images", {})
     
     print(f"📰 处理 {len(items)} 条新闻...")
     
-    success_count = 0
+    jobs, hashes, reused, queued, shared = [], {}, [], set(), []
     for i, item in enumerate(items):
         title = item.get("title", "")
         summary = item.get("summary", "")
@@ -431,21 +451,63 @@ def main():
         if not title:
             continue
         
-        filename = f"smart_news_{i+1}_{hashlib.md5(title.encode()).hexdigest()[:8]}.jpg"
-        output_path = f"assets/smart_generated/{filename}"
+        # 增量模式：内容与渲染版本都未变且图片仍在，直接复用
+        h = hashes[i] = image_hash(title, summary, source)
+        if not args.force and h in known and os.path.exists(known[h]):
+            item["image_path"] = known[h]
+            reused.append(known[h])
+            continue
         
-        if create_smart_news_image(title, summary, source, output_path):
-            item["image_path"] = output_path
+        # 文件名由内容哈希决定：同名文件的内容必然一致，不会复用到别条新闻的旧图；
+        # 同一批里内容相同的新闻只渲染一次
+        if h in queued:
+            shared.append(i)
+            continue
+        queued.add(h)
+        output_path = f"{OUTPUT_DIR}/smart_{h[:16]}.jpg"
+        jobs.append((i, title, summary, source, output_path))
+    
+    # 结果按原序号写回 JSON
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(render_item, jobs))
+    else:
+        results = [render_item(job) for job in jobs]
+    
+    success_count, rebuilt = len(reused), []
+    for i, output_path in results:
+        if output_path:
+            items[i]["image_path"] = output_path
+            known[hashes[i]] = output_path
+            rebuilt.append(output_path)
             success_count += 1
-            print(f"  ✅ 生成成功: {filename}")
+            print(f"  ✅ 生成成功: {os.path.basename(output_path)}")
         else:
-            item["image_path"] = "assets/placeholder.jpg"
+            items[i]["image_path"] = "assets/placeholder.jpg"
+    for i in shared:
+        if hashes[i] in known and os.path.exists(known[hashes[i]]):
+            items[i]["image_path"] = known[hashes[i]]
+            success_count += 1
+        else:
+            items[i]["image_path"] = "assets/placeholder.jpg"
     
     # 保存更新的数据
-    with open(news_json, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    news_io.save_items(news_json, items)
+    
+    # 清理已不存在的图片记录，并记录本次复用/重建情况
+    manifest["images"] = {h: p for h, p in known.items() if os.path.exists(p)}
+    manifest["last_run"] = {
+        "news": news_json,
+        "renderer_version": RENDERER_VERSION,
+        "template_version": TEMPLATE_VERSION,
+        "reused": reused,
+        "rebuilt": rebuilt,
+    }
+    save_manifest(manifest)
     
-    print(f"✅ 完成！成功生成 {success_count}/{len(items)} 张智能图片")
+    print(f"✅ 完成！成功生成 {success_count}/{len(items)} 张智能图片（复用 {len(reused)}，重建 {len(rebuilt)}）")
+    if _plates is not None:
+        print(f"🗂️ 背景模板缓存: {_plates.summary()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取式摘要引擎
+按语言切分句子，用 NumPy 矩阵一次算出句间相似度并做 TextRank 迭代；
+批量摘要时多篇文章补齐后叠成一个张量，相似度与迭代一次算完。
+进程内只初始化一次，结果按正文哈希缓存
+"""
+import re, hashlib, threading
+from collections import OrderedDict
+import numpy as np
+
+# 摘要默认值，可在 config.yaml 的 summary 段覆盖
+SUMMARY_DEFAULTS = {
+    "engine": "textrank",  # textrank | snownlp
+    "max_sent": 3,
+    "cache_size": 2048,    # 进程内按正文哈希缓存的条目数
+    "batch_size": 16,      # 批量摘要时一次叠成张量计算的文章数（按句数排序分组，减少补齐）
+}
+
+CJK_RE = re.compile(r"[一-鿿]")
+ZH_SPLIT_RE = re.compile(r"(?<=[。！？；!?])|\n+")
+EN_SPLIT_RE = re.compile(r"(?<=[.!?])[\"'”’)]*\s+(?=[\"“(A-Z0-9])|\n+")
+WORD_RE = re.compile(r"[a-z0-9]+")
+EN_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "at", "by",
+    "is", "are", "was", "were", "be", "been", "it", "its", "that", "this", "as", "from",
+    "has", "have", "had", "will", "would", "can", "could", "not", "we", "you", "they",
+}
+
+def is_chinese(text):
+    sample = text[:2000]
+    return len(CJK_RE.findall(sample)) > 0.2 * max(1, len(sample.strip()))
+
+def split_sentences(text, zh=None):
+    zh = is_chinese(text) if zh is None else zh
+    parts = (ZH_SPLIT_RE if zh else EN_SPLIT_RE).split(text)
+    min_len = 6 if zh else 20
+    return [p.strip() for p in parts if p and len(p.strip()) >= min_len]
+
+def sentence_terms(sent, zh):
+    if zh:
+        chars = CJK_RE.findall(sent)
+        terms = {a + b for a, b in zip(chars, chars[1:])}
+        terms.update(w for w in WORD_RE.findall(sent.lower()) if w not in EN_STOPWORDS)
+        return terms
+    return {w for w in WORD_RE.findall(sent.lower()) if w not in EN_STOPWORDS and len(w) > 1}
+
+def textrank_scores(term_sets, damping=0.85, iters=50, tol=1e-6):
+    """TextRank（Mihalcea 相似度）：sim = |Si∩Sj| / (log|Si| + log|Sj|)"""
+    return textrank_scores_batch([term_sets], damping, iters, tol)[0]
+
+def textrank_scores_batch(docs, damping=0.85, iters=50, tol=1e-6):
+    """
+    多篇文章一起做 TextRank：docs 为每篇的句子词集列表。
+    各篇按句数、词表大小补齐成 (篇数, 句数, 词数) 的 0/1 张量，批量矩阵乘得到句间重叠，
+    迭代时已收敛的文章不再更新，结果与逐篇计算一致
+    """
+    b = len(docs)
+    ns = np.array([len(d) for d in docs])
+    n = int(ns.max())
+    idx, rows, cols, width = [], [], [], 1
+    for k, term_sets in enumerate(docs):
+        flat = [t for terms in term_sets for t in terms]
+        vocab = {t: j for j, t in enumerate(dict.fromkeys(flat))}
+        counts = [len(terms) for terms in term_sets]
+        idx.append(np.full(len(flat), k))
+        rows.append(np.repeat(np.arange(len(term_sets)), counts))
+        cols.append(np.fromiter(map(vocab.__getitem__, flat), dtype=np.int64, count=len(flat)))
+        width = max(width, len(vocab))
+    m = np.zeros((b, n, width), dtype=np.float32)
+    m[np.concatenate(idx), np.concatenate(rows), np.concatenate(cols)] = 1.0
+    overlap = m @ m.transpose(0, 2, 1)
+    sizes = np.log(np.maximum(m.sum(axis=2), 2.0))
+    sim = overlap / (sizes[:, :, None] + sizes[:, None, :])
+    sim[:, np.arange(n), np.arange(n)] = 0.0
+    out = sim.sum(axis=2, keepdims=True)
+    trans = np.divide(sim, out, out=np.zeros_like(sim), where=out > 0)
+    valid = np.arange(n)[None, :] < ns[:, None]
+    base = ((1 - damping) / ns).astype(np.float32)[:, None]
+    scores = np.where(valid, (1.0 / ns).astype(np.float32)[:, None], np.float32(0))
+    active = np.ones(b, dtype=bool)
+    for _ in range(iters):
+        nxt = np.where(valid, base + damping * (scores[:, None, :] @ trans)[:, 0, :], np.float32(0))
+        done = np.abs(nxt - scores).sum(axis=1) < tol
+        scores = np.where(active[:, None], nxt, scores)
+        active &= ~done
+        if not active.any():
+            break
+    return [scores[k, :ns[k]] for k in range(b)]
+
+def fallback_summary(text):
+    paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
+    return " ".join(paragraphs)[:600]
+
+def summarize_snownlp(text, max_sent=3):
+    """原 SnowNLP 路径（保留作对照与备选）"""
+    try:
+        from snownlp import SnowNLP
+        s = SnowNLP(text)
+        sents = s.summary(max_sent)
+        if isinstance(sents, list):
+            return "；".join(sents)
+        return sents
+    except Exception:
+        return fallback_summary(text)
+
+class Summarizer:
+    def __init__(self, engine="textrank", max_sent=3, cache_size=2048, batch_size=16):
+        self.engine = engine
+        self.max_sent = int(max_sent)
+        self.cache_size = int(cache_size)
+        self.batch_size = max(1, int(batch_size))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text, max_sent):
+        return hashlib.sha1(("%s:%d:" % (self.engine, max_sent) + text).encode("utf-8")).hexdigest()
+
+    def _join(self, sents, zh):
+        if zh:
+            # 与 SnowNLP 输出格式一致：去掉句末标点，以“；”连接
+            return "；".join(s.rstrip("。！？；!?") for s in sents)
+        return " ".join(sents)
+
+    def _summarize_many(self, texts, max_sent):
+        """未命中缓存的正文：句子不足 max_sent 的直接输出，其余按句数分组批量打分"""
+        if self.engine == "snownlp":
+            return [summarize_snownlp(t, max_sent) for t in texts]
+        results = [None] * len(texts)
+        ranked = []  # (序号, 句子, 是否中文, 词集)
+        for k, text in enumerate(texts):
+            try:
+                zh = is_chinese(text)
+                sents = split_sentences(text, zh)
+                if not sents:
+                    results[k] = fallback_summary(text)
+                elif len(sents) <= max_sent:
+                    results[k] = self._join(sents, zh)
+                else:
+                    ranked.append((k, sents, zh, [sentence_terms(s, zh) for s in sents]))
+            except Exception:
+                results[k] = fallback_summary(texts[k])
+        ranked.sort(key=lambda job: len(job[1]))
+        for start in range(0, len(ranked), self.batch_size):
+            chunk = ranked[start:start + self.batch_size]
+            try:
+                all_scores = textrank_scores_batch([terms for _, _, _, terms in chunk])
+            except Exception:
+                for k, _, _, _ in chunk:
+                    results[k] = fallback_summary(texts[k])
+                continue
+            for (k, sents, zh, _), scores in zip(chunk, all_scores):
+                keep = sorted(np.argsort(-scores, kind="stable")[:max_sent])
+                results[k] = self._join([sents[i] for i in keep], zh)
+        return results
+
+    def summarize_batch(self, texts, max_sent=None):
+        max_sent = max_sent or self.max_sent
+        keys = [self._key(t, max_sent) for t in texts]
+        results = [None] * len(texts)
+        todo = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = hit
+                else:
+                    todo.setdefault(key, []).append(i)  # 同一批内相同的正文只摘要一次
+        if todo:
+            pending = list(todo.items())
+            summaries = self._summarize_many([texts[idx[0]] for _, idx in pending], max_sent)
+            with self._lock:
+                for (key, idx), summary in zip(pending, summaries):
+                    for i in idx:
+                        results[i] = summary
+                    self._cache[key] = summary
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def summarize(self, text, max_sent=None):
+        return self.summarize_batch([text], max_sent)[0]
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_summarizer(cfg=None):
+    """进程内单例；传入 cfg 时按 config.yaml 的 summary 段重建"""
+    global _engine
+    with _engine_lock:
+        if _engine is None or cfg is not None:
+            _engine = Summarizer(**dict(SUMMARY_DEFAULTS, **((cfg or {}).get("summary") or {})))
+        return _engine
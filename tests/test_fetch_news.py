@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fetch_news
+
+PARA = "<p>" + "This is a long article paragraph about artificial intelligence models and research. " * 8 + "</p>"
+PAGE = ("<html><head><title>Headline</title></head><body>"
+        "<article><h1 class='title'>Headline</h1><img src='/a.jpg'>"
+        "<div class='body'><p>Hello</p><script>var x=1;</script><style>p{}</style><!-- note -->"
+        "<p>World</p>%s%s</div></article>"
+        "<aside><img src='/side.jpg'></aside></body></html>") % (PARA, PARA)
+SELECTORS = {"title": "h1.title", "body": "div.body"}
+# 正文所在的 <article> 被 newspaper 选为 top node，清理后其中的 <img> 会被移除
+IMAGE_PAGE = ("<html><head><title>T</title></head><body><article><h1>T</h1><img src='/a.jpg'>%s%s</article>"
+              "<aside><img src='/side.jpg'></aside></body></html>") % (PARA, PARA)
+
+class NoTopImage(fetch_news.Article):
+    def parse(self):
+        super().parse()
+        self.top_image = ""
+
+class BrokenArticle(fetch_news.Article):
+    def parse(self):
+        raise RuntimeError("parse failed")
+
+def test_image_fallback_reads_uncleaned_tree(monkeypatch):
+    monkeypatch.setattr(fetch_news, "Article", NoTopImage)
+    _, _, img = fetch_news.parse_html("http://example.com/p", IMAGE_PAGE, {}, {})
+    assert img == "http://example.com/a.jpg"
+
+def test_selector_body_skips_inline_script(monkeypatch):
+    monkeypatch.setattr(fetch_news, "Article", BrokenArticle)
+    m = {}
+    title, body, img = fetch_news.parse_html("http://example.com/p", PAGE, SELECTORS, m)
+    assert m["newspaper_error"] == "RuntimeError"
+    assert title == "Headline"
+    assert body.startswith("Hello\nWorld\n")
+    assert "var x" not in body and "p{}" not in body and "note" not in body
+    assert img == "http://example.com/a.jpg"
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keywords import KeywordMatcher, Lexicon, merge_lexicon
+
+LEX = Lexicon(**merge_lexicon())
+
+def test_latin_terms_match_on_word_boundaries():
+    tags = LEX.tag("New metadata format; submit your paper")
+    assert tags["companies"] == []
+    tags = LEX.tag("Meta and MIT release gpt4 with DALL-E 3")
+    assert tags["companies"] == ["meta", "mit"]
+    assert tags["products"] == ["gpt", "dalle"]
+
+def test_chatgpt_tags_gpt_through_alias():
+    # 单词边界规则下 "gpt" 不再命中 "chatgpt"；默认词典用别名保留旧的标注结果
+    assert LEX.tag("ChatGPT 推出新功能")["products"] == ["gpt", "chatgpt"]
+    bare = KeywordMatcher([("gpt", "gpt"), ("chatgpt", "chatgpt")])
+    assert bare.find("chatgpt") == ["chatgpt"]
+
+def test_chinese_terms_match_as_substrings_including_overlaps():
+    m = KeywordMatcher([("机器人", 1), ("器人工", 2), ("人工智能", 3)])
+    assert sorted(m.find("机器人工智能")) == ["人工智能", "器人工", "机器人"]
+
+def test_tags_keep_lexicon_order_and_first_theme():
+    tags = LEX.tag("英伟达发布芯片，google 与 openai 合作")
+    assert tags["companies"] == ["openai", "google"]
+    assert LEX.theme(tags)["theme"] == "product_launch"